@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+
+from cvestore import counter, gauge
+
+# Events queued for a viewer before it counts as too slow and is dropped;
+# its browser reconnects and starts again from a full snapshot
+SUBSCRIBER_QUEUE = 16
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+# Milliseconds browsers wait before reconnecting a dropped stream
+RETRY_MS = 5000
+
+SUBSCRIBERS = gauge("analyzer_event_subscribers", "Viewers connected to the dashboard event stream")
+EVENTS_SENT = counter("analyzer_events_published_total", "Dashboard events published, by event", ["event"])
+SUBSCRIBERS_DROPPED = counter("analyzer_event_subscribers_dropped_total",
+                              "Viewers dropped for falling SUBSCRIBER_QUEUE events behind")
+
+
+# --- Server-sent Events ---
+def format_event(event, data, event_id=None):
+    """One text/event-stream message; `data` is sent as JSON on one line."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+    return "\n".join(lines) + "\n\n"
+
+
+class Broadcaster:
+    """
+    Pushes one piece of data, rebuilt whenever the dataset revision moves, to
+    every connected viewer.
+
+    `build()` is awaited at most once per revision however many viewers are
+    connected, and not at all while nobody is. A viewer gets a full
+    `snapshot` event when it connects, then `update` events carrying
+    `diff(old, new)`. Changes arriving within `min_interval` seconds of
+    each other are folded into one update.
+    """
+
+    def __init__(self, build, revision, diff, snapshot="dashboard", min_interval=2.0):
+        self.build = build
+        self.revision = revision
+        self.diff = diff
+        self.snapshot_event = snapshot
+        self.min_interval = min_interval
+        self.subscribers = set()
+        self.current = None
+        self.lock = asyncio.Lock()
+        self.changed = asyncio.Event()
+        self.task = None
+        self.loop = None
+
+    # --- Lifecycle ---
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.task = self.loop.create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+        for queue in list(self.subscribers):
+            self._close(queue)
+
+    def notify(self, revision=None):
+        """Signal a dataset change; safe to call from any thread."""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.changed.set)
+
+    async def _run(self):
+        while True:
+            await self.changed.wait()
+            self.changed.clear()
+            if not self.subscribers:
+                # Rebuilt on the next connect instead
+                continue
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.warning(f"[EVENTS] Rebuilding pushed data failed: {e}")
+            await asyncio.sleep(self.min_interval)
+
+    # --- Publishing ---
+    async def refresh(self):
+        """
+        Rebuild the data if the revision moved since the last build and send
+        the difference to every subscriber. Returns the current (revision, data).
+        """
+        async with self.lock:
+            revision = self.revision()
+            if self.current is not None and self.current[0] == revision:
+                return self.current
+            data = await self.build()
+            previous, self.current = self.current, (revision, data)
+            if previous is not None:
+                delta = self.diff(previous[1], data)
+                if delta is not None:
+                    self._publish(format_event("update", delta, revision), "update")
+            return self.current
+
+    def _publish(self, message, event):
+        EVENTS_SENT.inc(event=event)
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                SUBSCRIBERS_DROPPED.inc()
+                self._close(queue)
+
+    def _close(self, queue):
+        self.subscribers.discard(queue)
+        SUBSCRIBERS.set(len(self.subscribers))
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    # --- Subscribing ---
+    async def stream(self, last_event_id=None):
+        """
+        Messages for one viewer until it disconnects or is dropped. A viewer
+        reconnecting with the current revision as Last-Event-ID gets no snapshot.
+        """
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE)
+        revision, data = await self.refresh()
+        self.subscribers.add(queue)
+        SUBSCRIBERS.set(len(self.subscribers))
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            if last_event_id != str(revision):
+                EVENTS_SENT.inc(event=self.snapshot_event)
+                yield format_event(self.snapshot_event, data, revision)
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    # Comment line, so proxies do not close an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.subscribers.discard(queue)
+            SUBSCRIBERS.set(len(self.subscribers))
@@ -0,0 +1,144 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Query parameters that only defeat browser caches and never change the output
+IGNORED_PARAMS = {"ts"}
+
+# Bodies smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = 1024
+
+
+def cache_key(path, query_items, revision):
+    """Key for a response: path, sorted query parameters and data revision."""
+    params = tuple(sorted((k, v) for k, v in query_items if k not in IGNORED_PARAMS))
+    return (path, params, revision)
+
+
+def make_etag(body):
+    """Strong ETag over the response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def compress_variants(body, gzip_level=6, brotli_quality=5):
+    """Precompressed copies of `body` by content coding; br only when brotli is installed."""
+    if len(body) < COMPRESS_MIN_SIZE:
+        return {}
+    # mtime=0 keeps the gzip bytes, and so their ETag, identical across renders
+    variants = {"gzip": gzip.compress(body, gzip_level, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=brotli_quality)
+    return variants
+
+
+def choose_encoding(accept_encoding, variants):
+    """Preferred content coding among `variants` that the client accepts, or None."""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def variant_etag(etag, encoding):
+    """Strong ETag of a compressed variant: a different representation needs its own tag."""
+    return etag if encoding is None else etag[:-1] + "-" + encoding + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    If-None-Match check. Comparison is weak as the RFC asks for this header,
+    so a W/ prefix added by a proxy still matches.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def _entry_size(entry):
+    return len(entry[0]) + sum(len(v) for v in entry[3].values())
+
+
+class ResponseCache:
+    """
+    Bounded LRU of rendered responses keyed by `cache_key`.
+
+    Entries are (body, etag, media_type, variants), where variants maps a
+    content coding to the precompressed body. Both the number of entries and
+    their total size are capped. Entries of older revisions can never be
+    hit again, so they are dropped as soon as a newer revision is stored.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.revision = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, media_type, variants=None):
+        """Store a rendered body and its compressed variants and return the entry."""
+        variants = variants or {}
+        entry = (body, make_etag(body), media_type, variants)
+        size = len(body) + sum(len(v) for v in variants.values())
+        if size > self.max_bytes:
+            return entry
+        revision = key[-1]
+        with self.lock:
+            if self.revision is None or revision > self.revision:
+                self.entries.clear()
+                self.size = 0
+                self.revision = revision
+            elif revision < self.revision:
+                return entry
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= _entry_size(old)
+            self.entries[key] = entry
+            self.size += size
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= _entry_size(evicted)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
@@ -0,0 +1,494 @@
+import heapq
+import re
+from bisect import bisect_right
+import threading
+from datetime import date, timedelta
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from cvestore.metrics import histogram
+
+# --- Column Encoding ---
+# Each CVE is one row of fixed-width columns:
+#
+#   year, seq         CVE-<year>-<seq>, seq zero-padded to 4 digits; other ids
+#                     are kept as strings in `odd_ids`
+#   published, modified
+#                     timestamps as datetime64[ms], NaT when missing
+#   published_day, modified_day
+#                     day ordinals (days since 1970-01-01), DAY_NONE when missing
+#   score             baseScore * 10, SCORE_NONE when missing
+#   severity          index into `severities`, SEVERITY_NONE when missing
+#   ref_start, ref_len
+#                     slice of `blob` holding the references joined by "\n"
+#
+# Deleted rows are only marked dead and their slot is reused; reference bytes
+# are appended and the blob is rebuilt once most of it is garbage.
+CVE_ID_PATTERN = re.compile(r"CVE-(\d{4})-(\d{4,9})")
+KEY_ID_PATTERN = re.compile(r"/CVE-(\d{4})-(\d{4,9})$")
+DAY_NONE = np.iinfo(np.int32).min
+SCORE_NONE = 0xFF
+SEVERITY_NONE = -1
+EPOCH = date(1970, 1, 1)
+
+# Columns a frame built from the store carries, besides the day columns
+CVE_COLUMNS = ["cveId", "datePublished", "dateModified", "baseScore", "baseSeverity", "references"]
+
+# Typed day column (datetime64, midnight) derived from each date field
+DAY_COLUMNS = {
+    "datePublished": "publishedDay",
+    "dateModified": "modifiedDay",
+}
+
+# Known severities in ascending order; others are appended as extra categories
+SEVERITY_ORDER = ["NONE", "LOW", "MEDIUM", "HIGH", "CRITICAL"]
+
+FRAME_SECONDS = histogram("analyzer_frame_build_seconds", "Seconds to build one DataFrame, by kind", ["kind"])
+
+# Reference blob is rebuilt when garbage exceeds this share of it
+BLOB_GARBAGE_RATIO = 0.5
+BLOB_MIN_COMPACT = 1024 * 1024
+
+_FIELDS = {
+    "live": np.bool_,
+    "year": np.uint16,
+    "seq": np.uint32,
+    "published": "datetime64[ms]",
+    "modified": "datetime64[ms]",
+    "published_day": np.int32,
+    "modified_day": np.int32,
+    "score": np.uint8,
+    "severity": np.int8,
+    "ref_start": np.int64,
+    "ref_len": np.uint32,
+}
+
+# Date field -> (timestamp column, day ordinal column)
+_DATE_COLUMNS = {
+    "datePublished": ("published", "published_day"),
+    "dateModified": ("modified", "modified_day"),
+}
+
+
+def day_ordinal(day):
+    """Day ordinal of a date, as stored in the day columns."""
+    return (day - EPOCH).days
+
+
+def _timestamp(value):
+    if not value:
+        return np.datetime64("NaT", "ms")
+    try:
+        return np.datetime64(value[:23], "ms")
+    except ValueError:
+        return np.datetime64("NaT", "ms")
+
+
+def _timestamps(values):
+    """datetime64[ms] array of NVD timestamp strings; bad values become NaT."""
+    try:
+        return np.array([value[:23] if value else "NaT" for value in values], dtype="datetime64[ms]")
+    except (TypeError, ValueError):
+        return np.array([_timestamp(value) for value in values], dtype="datetime64[ms]")
+
+
+def _packed_id(match):
+    """(year, seq) of a matched CVE id, or None when seq would not print back the same."""
+    year, seq = match.group(1), match.group(2)
+    if len(seq) == 4 or not seq.startswith("0"):
+        return int(year), int(seq)
+    return None
+
+
+def _slot_key(key):
+    # Keys end in the CVE id; an int is far smaller than the key string
+    match = KEY_ID_PATTERN.search(key)
+    packed = _packed_id(match) if match else None
+    return key if packed is None else (packed[0] << 34) | packed[1]
+
+
+def _score(value):
+    try:
+        return SCORE_NONE if value is None else min(int(round(float(value) * 10)), SCORE_NONE - 1)
+    except (TypeError, ValueError):
+        return SCORE_NONE
+
+
+class CveStore:
+    """
+    Columnar copy of every CVE, updated in batches of records.
+
+    Keys are etcd keys under a single prefix, indexed by the CVE id they
+    end with. Writers must be serialized by the caller. Readers take a
+    `snapshot()`, which shares the columns until the next write copies
+    them, and shares the append-only reference blob.
+    """
+
+    def __init__(self, capacity=1024):
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in _FIELDS.items()}
+        self.size = 0
+        self.slots = {}
+        self.free = []
+        self.odd_ids = {}
+        self.severities = list(SEVERITY_ORDER)
+        self.blob = bytearray()
+        self.garbage = 0
+        self._shared = False
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _resize(self, capacity):
+        for name, column in self.columns.items():
+            resized = np.zeros(capacity, dtype=column.dtype)
+            resized[:self.size] = column[:self.size]
+            self.columns[name] = resized
+        self._shared = False
+
+    def _unshare(self):
+        # Copy-on-write: a snapshot still reads the current arrays
+        if self._shared:
+            self._resize(len(self.columns["live"]))
+
+    def _slot(self, key):
+        key = _slot_key(key)
+        slot = self.slots.get(key)
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+            else:
+                if self.size == len(self.columns["live"]):
+                    self._resize(max(self.size * 2, 1024))
+                slot = self.size
+                self.size += 1
+            self.slots[key] = slot
+        return slot
+
+    def _severity_code(self, severity):
+        if severity is None:
+            return SEVERITY_NONE
+        try:
+            return self.severities.index(severity)
+        except ValueError:
+            self.severities.append(severity)
+            return len(self.severities) - 1
+
+    def _encode(self, records):
+        """Column arrays for `records`, odd ids by row and encoded references."""
+        years, seqs, odd_ids = [], [], {}
+        for row, record in enumerate(records):
+            cve_id = record.get("cveId") or ""
+            match = CVE_ID_PATTERN.fullmatch(cve_id)
+            packed = _packed_id(match) if match else None
+            if packed is not None:
+                years.append(packed[0])
+                seqs.append(packed[1])
+            else:
+                years.append(0)
+                seqs.append(0)
+                odd_ids[row] = cve_id
+
+        columns = {
+            "year": np.array(years, dtype=np.uint16),
+            "seq": np.array(seqs, dtype=np.uint32),
+            "score": np.array([_score(r.get("baseScore")) for r in records], dtype=np.uint8),
+            "severity": np.array([self._severity_code(r.get("baseSeverity")) for r in records], dtype=np.int8),
+        }
+        for field, (ts_column, day_column) in _DATE_COLUMNS.items():
+            ts = _timestamps([r.get(field) for r in records])
+            days = ts.astype("datetime64[D]").astype(np.int64)
+            days[np.isnat(ts)] = DAY_NONE
+            columns[ts_column] = ts
+            columns[day_column] = days.astype(np.int32)
+
+        refs = ["\n".join(r.get("references") or []).encode("utf-8") for r in records]
+        return columns, odd_ids, refs
+
+    # --- Writes ---
+    def put_many(self, items):
+        """Insert or replace (key, record) pairs; a repeated key keeps its last record."""
+        items = list({_slot_key(key): (key, record) for key, record in items}.values())
+        if not items:
+            return
+        self._unshare()
+        slots = np.array([self._slot(key) for key, _ in items], dtype=np.int64)
+        columns, odd_ids, refs = self._encode([record for _, record in items])
+
+        c = self.columns
+        for name, values in columns.items():
+            c[name][slots] = values
+        lengths = np.fromiter(map(len, refs), dtype=np.int64, count=len(refs))
+        self.garbage += int(c["ref_len"][slots].sum())
+        c["ref_start"][slots] = len(self.blob) + np.cumsum(lengths) - lengths
+        c["ref_len"][slots] = lengths
+        self.blob += b"".join(refs)
+        c["live"][slots] = True
+
+        for slot in slots.tolist():
+            self.odd_ids.pop(slot, None)
+        for row, cve_id in odd_ids.items():
+            self.odd_ids[int(slots[row])] = cve_id
+        self._maybe_compact()
+
+    def delete(self, key):
+        """Drop the CVE stored under `key`; returns False if it was not stored."""
+        slot = self.slots.pop(_slot_key(key), None)
+        if slot is None:
+            return False
+        self._unshare()
+        self.columns["live"][slot] = False
+        self.garbage += int(self.columns["ref_len"][slot])
+        self.columns["ref_len"][slot] = 0
+        self.odd_ids.pop(slot, None)
+        self.free.append(slot)
+        return True
+
+    def _maybe_compact(self):
+        if self.garbage < BLOB_MIN_COMPACT or self.garbage < len(self.blob) * BLOB_GARBAGE_RATIO:
+            return
+        # A new bytearray, so snapshots holding the old one stay valid
+        blob = bytearray()
+        starts = self.columns["ref_start"]
+        lengths = self.columns["ref_len"]
+        for slot in self.slots.values():
+            start, length = int(starts[slot]), int(lengths[slot])
+            starts[slot] = len(blob)
+            blob += self.blob[start:start + length]
+        self.blob = blob
+        self.garbage = 0
+
+    # --- Reads ---
+    def slot_of(self, key):
+        """Row holding the CVE stored under `key`, or None."""
+        return self.slots.get(_slot_key(key))
+
+    def rollup_counts(self, slots):
+        """
+        Number of rows at `slots` per (date field, day, severity), read from
+        the day and severity columns; rows without a day are left out.
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        codes = self.columns["severity"][slots].astype(np.int64) - SEVERITY_NONE
+        counts = {}
+        for field, (_, day_column) in _DATE_COLUMNS.items():
+            days = self.columns[day_column][slots]
+            has_day = days != DAY_NONE
+            # One int per (day, severity code) so np.unique groups both at once
+            groups, group_counts = np.unique(
+                (days[has_day].astype(np.int64) << 8) | codes[has_day], return_counts=True)
+            for group, count in zip(groups.tolist(), group_counts.tolist()):
+                code = (group & 0xFF) + SEVERITY_NONE
+                severity = None if code == SEVERITY_NONE else self.severities[code]
+                counts[field, EPOCH + timedelta(days=group >> 8), severity] = count
+        return counts
+
+    def snapshot(self):
+        self._shared = True
+        return CveSnapshot(
+            {name: column[:self.size] for name, column in self.columns.items()},
+            self.blob, tuple(self.severities), dict(self.odd_ids))
+
+
+class CveSnapshot:
+    """
+    Immutable view of the store. Positions returned by `select` index the
+    columns directly; rows are only decoded by `frame` and `record`.
+    """
+
+    def __init__(self, columns, blob, severities, odd_ids):
+        self.columns = columns
+        self.blob = blob
+        self.severities = severities
+        self.odd_ids = odd_ids
+        self._day_indexes = {}
+        self._index_lock = threading.Lock()
+
+    def __len__(self):
+        return int(self.columns["live"].sum())
+
+    # --- Filters ---
+    def select(self, date_field, from_day=None, to_day=None, severities=None):
+        """
+        Positions of live CVEs whose `date_field` day is in [from_day, to_day];
+        a None bound leaves that side open.
+        """
+        days = self.columns[_DATE_COLUMNS[date_field][1]]
+        mask = self.columns["live"] & (days != DAY_NONE)
+        if from_day is not None:
+            mask &= days >= day_ordinal(from_day)
+        if to_day is not None:
+            mask &= days <= day_ordinal(to_day)
+        if severities is not None:
+            mask &= np.isin(self.columns["severity"], self.severity_codes(severities))
+        return np.flatnonzero(mask)
+
+    def severity_codes(self, severities):
+        return [code for code, name in enumerate(self.severities) if name in severities]
+
+    def _score_key(self, positions):
+        scores = self.columns["score"][positions].astype(np.int16)
+        scores[scores == SCORE_NONE] = -1
+        return scores
+
+    def order_by_day_score(self, positions, date_field, newest_first=False):
+        """`positions` ordered by day, then by score (highest first)."""
+        days = self.columns[_DATE_COLUMNS[date_field][1]][positions].astype(np.int64)
+        return positions[np.lexsort((-self._score_key(positions), -days if newest_first else days))]
+
+    def day_index(self, date_field):
+        """DayIndex of `date_field`, built on first use and kept with the snapshot."""
+        with self._index_lock:
+            index = self._day_indexes.get(date_field)
+            if index is None:
+                index = self._day_indexes[date_field] = DayIndex(self, date_field)
+            return index
+
+    # --- Decoding ---
+    def cve_ids(self, positions):
+        years = self.columns["year"][positions]
+        seqs = self.columns["seq"][positions]
+        return [self.odd_ids[p] if p in self.odd_ids else f"CVE-{y}-{s:04d}"
+                for p, y, s in zip(positions.tolist(), years.tolist(), seqs.tolist())]
+
+    def references(self, position):
+        start = int(self.columns["ref_start"][position])
+        length = int(self.columns["ref_len"][position])
+        if not length:
+            return []
+        return bytes(self.blob[start:start + length]).decode("utf-8").split("\n")
+
+    def _timestamps(self, column, positions):
+        values = np.datetime_as_string(self.columns[column][positions], unit="ms")
+        return [None if v == "NaT" else v for v in values.tolist()]
+
+    def frame(self, positions, references=True):
+        """
+        DataFrame of the rows at `positions`, in that order: the CVE_COLUMNS
+        plus a datetime64 day column per date field, float32 `baseScore` and
+        categorical `baseSeverity`.
+        """
+        with FRAME_SECONDS.time(kind="cves"):
+            positions = np.asarray(positions, dtype=np.int64)
+            scores = self.columns["score"][positions]
+            codes = self.columns["severity"][positions]
+            df = pd.DataFrame({
+                "cveId": pd.Series(self.cve_ids(positions), dtype=object),
+                "datePublished": pd.Series(self._timestamps("published", positions), dtype=object),
+                "dateModified": pd.Series(self._timestamps("modified", positions), dtype=object),
+                "baseScore": np.where(scores == SCORE_NONE, np.nan, scores / 10).astype("float32"),
+                "baseSeverity": pd.Categorical.from_codes(codes.astype(np.int64), categories=list(self.severities)),
+                "references": pd.Series([self.references(p) for p in positions.tolist()] if references else None,
+                                        dtype=object),
+            }, columns=CVE_COLUMNS)
+            for field, (ts_column, _) in _DATE_COLUMNS.items():
+                df[DAY_COLUMNS[field]] = pd.to_datetime(self.columns[ts_column][positions].astype("datetime64[D]"))
+            return df
+
+
+class DayIndex:
+    """
+    Live CVEs of one date field grouped by day and then by severity. Each
+    run is sorted by score (highest first, missing scores last), then by
+    CVE id, with the position as the last tie-break. Top-N for a day is a
+    merge of the runs of the wanted severities.
+    """
+
+    def __init__(self, snapshot, date_field):
+        self.snapshot = snapshot
+        positions = snapshot.select(date_field)
+        days = snapshot.columns[_DATE_COLUMNS[date_field][1]][positions]
+        codes = snapshot.columns["severity"][positions]
+        scores = snapshot._score_key(positions)
+        years = snapshot.columns["year"][positions]
+        seqs = snapshot.columns["seq"][positions]
+        order = np.lexsort((positions, seqs, years, -scores, codes, days))
+        self.positions = positions[order]
+        self.scores = scores[order]
+        self.years = years[order]
+        self.seqs = seqs[order]
+        days, codes = days[order], codes[order]
+
+        # day ordinal -> {severity code: (start, end) in self.positions}
+        self.runs = {}
+        bounds = np.flatnonzero((days[1:] != days[:-1]) | (codes[1:] != codes[:-1])) + 1
+        starts = np.concatenate(([0], bounds)).tolist() if len(days) else []
+        ends = np.concatenate((bounds, [len(days)])).tolist() if len(days) else []
+        for start, end in zip(starts, ends):
+            self.runs.setdefault(int(days[start]), {})[int(codes[start])] = (start, end)
+        self.ordinals = sorted(self.runs)
+        self.days = [EPOCH + timedelta(days=d) for d in self.ordinals]
+
+    def _runs(self, ordinal, severities):
+        runs = self.runs.get(ordinal, {})
+        if severities is not None:
+            codes = set(self.snapshot.severity_codes(severities))
+            runs = {code: run for code, run in runs.items() if code in codes}
+        return list(runs.values())
+
+    def _keys(self, start, end):
+        """Sort keys (-score, year, seq, position) of run rows [start, end)."""
+        return zip((-self.scores[start:end]).tolist(), self.years[start:end].tolist(),
+                   self.seqs[start:end].tolist(), self.positions[start:end].tolist())
+
+    def _skip(self, start, end, key):
+        """Number of leading rows of a run whose sort key is <= `key`."""
+        neg, year, seq, position = key
+        scores = -self.scores[start:end].astype(np.int32)
+        years = self.years[start:end].astype(np.int64)
+        seqs = self.seqs[start:end].astype(np.int64)
+        positions = self.positions[start:end]
+        done = (scores < neg) | ((scores == neg) & (
+            (years < year) | ((years == year) & (
+                (seqs < seq) | ((seqs == seq) & (positions <= position))))))
+        return int(done.sum())
+
+    def top(self, day, severities=None, limit=None):
+        """Positions of CVEs on `day`, highest score first, optionally by severity."""
+        runs = self._runs(day_ordinal(day), severities)
+        if not runs:
+            return np.array([], dtype=np.int64)
+        if len(runs) == 1:
+            start, end = runs[0]
+            return self.positions[start:end if limit is None else min(end, start + limit)]
+        merged = heapq.merge(*(self._keys(start, end) for start, end in runs))
+        return np.array([key[-1] for key in islice(merged, limit)], dtype=np.int64)
+
+    def page(self, from_day=None, to_day=None, severities=None, after=None, limit=50):
+        """
+        Keyset page over days from `to_day` back to `from_day`: up to `limit`
+        positions ordered by day (newest first), score (highest first) and
+        CVE id, starting after the cursor `after`. Returns the positions and
+        the cursor of the next page, or None on the last page.
+
+        A cursor is (day ordinal, -score, year, seq, position) of the last
+        row returned; it holds values rather than offsets, so it stays valid
+        when CVEs are added or removed between pages.
+        """
+        low = day_ordinal(from_day) if from_day is not None else None
+        high = day_ordinal(to_day) if to_day is not None else None
+        if after is not None:
+            high = after[0] if high is None else min(high, after[0])
+
+        index = len(self.ordinals) - 1 if high is None else bisect_right(self.ordinals, high) - 1
+        keys = []
+        # One row beyond the page tells whether another page exists
+        wanted = limit + 1
+        while index >= 0 and len(keys) < wanted:
+            ordinal = self.ordinals[index]
+            if low is not None and ordinal < low:
+                break
+            need = wanted - len(keys)
+            runs = []
+            for start, end in self._runs(ordinal, severities):
+                if after is not None and ordinal == after[0]:
+                    start += self._skip(start, end, after[1:])
+                runs.append(self._keys(start, min(end, start + need)))
+            keys.extend((ordinal,) + key for key in islice(heapq.merge(*runs), need))
+            index -= 1
+
+        more = len(keys) > limit
+        keys = keys[:limit]
+        positions = np.array([key[-1] for key in keys], dtype=np.int64)
+        return positions, (keys[-1] if more else None)
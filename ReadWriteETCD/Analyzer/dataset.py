@@ -0,0 +1,272 @@
+import logging
+import threading
+from collections import Counter
+
+import pandas as pd
+from etcd3.events import DeleteEvent, PutEvent
+from etcd3.exceptions import RevisionCompactedError
+
+from columnar import FRAME_SECONDS, CveStore
+from cvestore import ANALYZED_PREFIX, counter, decode_value, histogram
+from search import ReferenceIndex
+
+# Seconds to wait before re-establishing a broken watch
+WATCH_RETRY_DELAY = 5
+
+# Decoded records handed to the columnar store at a time while loading
+LOAD_BATCH = 10000
+
+LOAD_SECONDS = histogram("analyzer_dataset_load_seconds", "Seconds to load the dataset, by step", ["step"])
+WATCH_EVENTS = counter("analyzer_watch_events_total", "etcd watch events applied, by type", ["type"])
+WATCH_BREAKS = counter("analyzer_watch_breaks_total", "Broken etcd watches, by whether a reload followed",
+                       ["reload"])
+
+
+# --- Daily Severity Rollups ---
+class SeverityRollup:
+    """
+    CVE counts per (date field, day, severity), kept up to date batch by
+    batch from the store's columns (CveStore.rollup_counts) so charts never
+    have to group the whole corpus.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def add(self, counts):
+        self.counts.update(counts)
+
+    def remove(self, counts):
+        for key, count in counts.items():
+            self.counts[key] -= count
+            if self.counts[key] <= 0:
+                del self.counts[key]
+
+    def frame(self):
+        rows = [(field, day, severity, count) for (field, day, severity), count in self.counts.items()]
+        df = pd.DataFrame(rows, columns=["dateField", "day", "severity", "count"])
+        df["day"] = pd.to_datetime(df["day"])
+        return df
+
+
+# --- In-memory CVE Dataset ---
+class CveDataset:
+    """
+    Process-wide copy of every CVE under `prefix`.
+
+    It is loaded once with a ranged read and then kept current by an etcd
+    watch starting right after the loaded revision. Puts and deletes are
+    applied as they arrive; when the watch breaks it is resumed from the
+    last applied revision, or the dataset is reloaded if that revision
+    has been compacted away.
+    """
+
+    def __init__(self, etcd, prefix=ANALYZED_PREFIX):
+        self.etcd = etcd
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.store = CveStore()
+        self.rollup = SeverityRollup()
+        self.references = ReferenceIndex()
+        self.revision = 0
+        self._snapshot = None
+        self._rollup_frame = None
+        self._watch_client = None
+        self._watch_id = None
+        self._stopped = False
+        self.listeners = []
+
+    # --- Lifecycle ---
+    def start(self):
+        self.load()
+        self._watch()
+
+    def stop(self):
+        self._stopped = True
+        self._cancel_watch()
+
+    def load(self):
+        """
+        Replace the dataset with a fresh ranged read.
+        """
+        with LOAD_SECONDS.time(step="read"):
+            response = self.etcd.get_prefix_response(self.prefix)
+        with LOAD_SECONDS.time(step="build"):
+            store = CveStore(capacity=max(len(response.kvs), 1024))
+            rollup = SeverityRollup()
+            references = ReferenceIndex()
+            batch = []
+            for kv in response.kvs:
+                record = self._decode(kv.value)
+                if record is not None:
+                    batch.append((kv.key.decode(), record))
+                if len(batch) >= LOAD_BATCH:
+                    self._load_batch(store, rollup, references, batch)
+                    batch = []
+            self._load_batch(store, rollup, references, batch)
+        with self.lock:
+            self.store = store
+            self.rollup = rollup
+            self.references = references
+            self.revision = response.header.revision
+            self._snapshot = None
+            self._rollup_frame = None
+        logging.info(f"[DATASET] Loaded {len(store)} CVEs at revision {self.revision}")
+        self._notify()
+
+    @staticmethod
+    def _load_batch(store, rollup, references, batch):
+        store.put_many(batch)
+        slots = [store.slot_of(key) for key, _ in batch]
+        rollup.add(store.rollup_counts(slots))
+        for slot, (_, record) in zip(slots, batch):
+            references.add(slot, record)
+
+    # --- Watch ---
+    def _watch(self):
+        client = self.etcd.reader()
+        self._watch_id = client.add_watch_prefix_callback(
+            self.prefix, self._on_watch_response, start_revision=self.revision + 1)
+        self._watch_client = client
+        logging.info(f"[DATASET] Watching {self.prefix} from revision {self.revision + 1}")
+
+    def _cancel_watch(self):
+        if self._watch_client is not None and self._watch_id is not None:
+            try:
+                self._watch_client.cancel_watch(self._watch_id)
+            except Exception as e:
+                logging.debug(f"[DATASET] Cancel watch failed: {e}")
+        self._watch_client = None
+        self._watch_id = None
+
+    def _on_watch_response(self, response):
+        if isinstance(response, Exception):
+            logging.warning(f"[DATASET] Watch broken: {response!r}")
+            reload = isinstance(response, RevisionCompactedError)
+            WATCH_BREAKS.inc(reload=str(reload).lower())
+            self._schedule_resume(reload=reload)
+            return
+        self.apply_events(response.events)
+
+    def _schedule_resume(self, reload=False):
+        if self._stopped:
+            return
+        timer = threading.Timer(WATCH_RETRY_DELAY, self._resume, kwargs={"reload": reload})
+        timer.daemon = True
+        timer.start()
+
+    def _resume(self, reload=False):
+        self._cancel_watch()
+        try:
+            if reload:
+                self.load()
+            self._watch()
+        except RevisionCompactedError:
+            self._schedule_resume(reload=True)
+        except Exception as e:
+            logging.warning(f"[DATASET] Resume failed, retrying: {e}")
+            self._schedule_resume(reload=reload)
+
+    def apply_events(self, events):
+        """
+        Apply watch events to the dataset and advance its revision.
+
+        A response is applied as one batch: only the last event per key
+        counts, values are decoded before the lock is taken, and the rows
+        being replaced or deleted leave the rollup straight from the columns.
+
+        The revision advances to the newest event applied, not the response
+        header: while a watch catches up, every batch carries the store's
+        current revision, and resuming from it would skip undelivered events.
+        """
+        # key -> record to store, or None to delete
+        changes = {}
+        for event in events:
+            key = event.key.decode()
+            if isinstance(event, PutEvent):
+                WATCH_EVENTS.inc(type="put")
+                record = self._decode(event.value)
+                if record is not None:
+                    changes[key] = record
+            elif isinstance(event, DeleteEvent):
+                WATCH_EVENTS.inc(type="delete")
+                changes[key] = None
+
+        with self.lock:
+            store = self.store
+            old_slots = [slot for slot in map(store.slot_of, changes) if slot is not None]
+            self.rollup.remove(store.rollup_counts(old_slots))
+            for key, record in changes.items():
+                slot = store.slot_of(key)
+                if record is None and slot is not None:
+                    self.references.remove(slot)
+                    store.delete(key)
+            puts = [(key, record) for key, record in changes.items() if record is not None]
+            store.put_many(puts)
+            slots = [store.slot_of(key) for key, _ in puts]
+            self.rollup.add(store.rollup_counts(slots))
+            for slot, (_, record) in zip(slots, puts):
+                self.references.add(slot, record)
+            if events:
+                self._snapshot = None
+                self._rollup_frame = None
+            self.revision = max([self.revision] + [event.mod_revision for event in events])
+        if events:
+            self._notify()
+
+    # --- Listeners ---
+    def add_listener(self, callback):
+        """
+        Call `callback(revision)` after every load and every applied batch of
+        watch events. It runs on the loading or watching thread, outside the
+        lock, so it should only hand the news on.
+        """
+        self.listeners.append(callback)
+
+    def _notify(self):
+        for callback in list(self.listeners):
+            try:
+                callback(self.revision)
+            except Exception as e:
+                logging.warning(f"[DATASET] Listener failed: {e}")
+
+    # --- Snapshot ---
+    def snapshot(self):
+        """
+        Columnar snapshot of every CVE at the current revision. Shared
+        between requests until the next change; read only.
+        """
+        with self.lock:
+            return self._current_snapshot()
+
+    def _current_snapshot(self):
+        if self._snapshot is None:
+            self._snapshot = self.store.snapshot()
+        return self._snapshot
+
+    def lookup_references(self, token):
+        """
+        Snapshot and the positions in it of the CVEs with a reference
+        matching `token` (see search.reference_tokens), taken together.
+        """
+        with self.lock:
+            return self._current_snapshot(), self.references.lookup(token)
+
+    def rollups(self):
+        """
+        Daily severity rollups as a DataFrame with columns dateField, day
+        (datetime64), severity and count. Shared between requests; read only.
+        """
+        with self.lock:
+            if self._rollup_frame is None:
+                with FRAME_SECONDS.time(kind="rollups"):
+                    self._rollup_frame = self.rollup.frame()
+            return self._rollup_frame
+
+    @staticmethod
+    def _decode(value):
+        try:
+            return decode_value(value)
+        except Exception as e:
+            logging.debug(f"[DATASET] Undecodable value skipped: {e}")
+            return None
@@ -0,0 +1,159 @@
+import json
+
+from columnar import CVE_COLUMNS, DAY_COLUMNS
+
+# Rows per chunk handed to the response; bounds the memory of one export
+EXPORT_CHUNK_ROWS = 5000
+
+
+# --- Row Selection ---
+def select_rows(snapshot, date_field, from_day, to_day, severities=None):
+    """
+    Positions of the CVEs to export, ordered by day and then by score
+    (highest first). A None bound leaves that side of the range open.
+    """
+    positions = snapshot.select(date_field, from_day, to_day, severities)
+    return snapshot.order_by_day_score(positions, date_field)
+
+
+def iter_chunks(snapshot, positions, date_field):
+    """Export columns for `positions`, decoded EXPORT_CHUNK_ROWS at a time."""
+    day_column = DAY_COLUMNS[date_field]
+    # An empty export still yields one empty chunk so headers and schemas get written
+    for start in range(0, max(len(positions), 1), EXPORT_CHUNK_ROWS):
+        chunk = snapshot.frame(positions[start:start + EXPORT_CHUNK_ROWS])
+        # Same columns as the CSV always had, with the chosen date field cut to the day
+        yield chunk[CVE_COLUMNS].assign(**{
+            date_field: chunk[day_column].dt.date,
+            "baseScore": chunk["baseScore"].astype("float64").round(1),
+        })
+
+
+# --- Writers ---
+def iter_csv(chunks, date_field):
+    first = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=first)
+        first = False
+
+
+def iter_ndjson(chunks, date_field):
+    for chunk in chunks:
+        lines = []
+        for row in chunk.itertuples(index=False):
+            record = dict(zip(CVE_COLUMNS, row))
+            for field in DAY_COLUMNS:
+                if record[field] is not None and not isinstance(record[field], str):
+                    record[field] = str(record[field])
+            if record["baseScore"] != record["baseScore"]:
+                record["baseScore"] = None
+            if record["baseSeverity"] != record["baseSeverity"]:
+                record["baseSeverity"] = None
+            lines.append(json.dumps(record, ensure_ascii=False))
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+
+class ChunkSink:
+    """
+    Write-only file for pyarrow writers. Bytes are handed out with
+    `drain()` as soon as they are written; `tell()` keeps counting so
+    offsets in the Parquet footer stay correct.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.pending.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def drain(self):
+        data = b"".join(self.pending)
+        self.pending = []
+        return data
+
+
+def arrow_schema(date_field):
+    """Arrow schema of an export: the chosen date field is a date, the other stays a timestamp string."""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("cveId", pa.string()),
+        ("datePublished", pa.date32() if date_field == "datePublished" else pa.string()),
+        ("dateModified", pa.date32() if date_field == "dateModified" else pa.string()),
+        ("baseScore", pa.float64()),
+        ("baseSeverity", pa.dictionary(pa.int8(), pa.string())),
+        ("references", pa.list_(pa.string())),
+    ])
+
+
+def _arrow_tables(chunks, schema):
+    import pyarrow as pa
+
+    for chunk in chunks:
+        yield pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+
+
+def iter_arrow(chunks, date_field):
+    import pyarrow as pa
+
+    schema = arrow_schema(date_field)
+    sink = ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    for table in _arrow_tables(chunks, schema):
+        writer.write_table(table)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def iter_parquet(chunks, date_field):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(date_field)
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    for table in _arrow_tables(chunks, schema):
+        # One row group per chunk, written out before the next chunk is built
+        writer.write_table(table)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+# format -> (writer, media type, file extension, needs pyarrow)
+EXPORT_FORMATS = {
+    "csv": (iter_csv, "text/csv", "csv", False),
+    "ndjson": (iter_ndjson, "application/x-ndjson", "ndjson", False),
+    "arrow": (iter_arrow, "application/vnd.apache.arrow.stream", "arrows", True),
+    "parquet": (iter_parquet, "application/vnd.apache.parquet", "parquet", True),
+}
+
+
+def pyarrow_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
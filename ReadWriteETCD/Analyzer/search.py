@@ -0,0 +1,214 @@
+import re
+from array import array
+from bisect import bisect_right
+
+import numpy as np
+
+# Up to this many candidate rows, a substring is checked row by row instead
+# of scanning the whole reference blob
+ROW_SCAN_LIMIT = 20000
+
+# Host labels that say nothing about the vendor
+IGNORED_LABELS = {"www", "lists", "security", "support", "docs", "bugs", "git"}
+
+ID_PREFIX_PATTERN = re.compile(r"C(?:V(?:E(?:-(\d{0,4})(?:-(\d{0,9}))?)?)?)?")
+# scheme://[user@]host[:port][/first-segment], on the lowercased URL
+URL_PATTERN = re.compile(r"[a-z][a-z0-9+.-]*://(?:[^/@?#]*@)?([^/:?#\[\]]+)(?::\d*)?(?:/+([^/?#]+))?")
+HOST_PATTERN = re.compile(r"[a-z0-9][a-z0-9-]*(\.[a-z0-9-]+)*|[a-z0-9-]+(\.[a-z0-9-]+)+/[^/\s]+")
+
+
+# --- Query Kinds ---
+def classify_query(query):
+    """
+    Search kind for a free-text query: "id" for CVE id prefixes, "host" for
+    domains, vendor names and host/first-segment, "url" for anything else
+    (reference substring).
+    """
+    text = query.strip()
+    upper = text.upper()
+    if upper.startswith("CVE") or re.fullmatch(r"\d{4}(-\d*)?", text):
+        return "id"
+    if HOST_PATTERN.fullmatch(text.lower()):
+        return "host"
+    return "url"
+
+
+def normalize_id_prefix(query):
+    text = query.strip().upper()
+    return text if text.startswith("C") else "CVE-" + text
+
+
+def host_token(query):
+    """Index token for a host query: a domain, a vendor label or host/first-path-segment."""
+    text = query.strip().lower()
+    text = re.sub(r"^[a-z]+://", "", text).rstrip("/")
+    return text[4:] if text.startswith("www.") else text
+
+
+def url_host(query):
+    """
+    Exact host of a query pasted with its scheme (https://host/...), whose
+    matches all carry that host as a token; None otherwise.
+    """
+    match = URL_PATTERN.match(query.strip().lower())
+    return match.group(1) if match and "." in match.group(1) else None
+
+
+# --- Reference Tokens ---
+def reference_tokens(references):
+    """
+    Tokens of a CVE's reference URLs: every host suffix with at least two
+    labels (www.oracle.com, oracle.com), the vendor-like labels (oracle)
+    and host/first-path-segment (github.com/apache).
+    """
+    tokens = set()
+    for url in references or []:
+        match = URL_PATTERN.match(url.lower())
+        if match is None:
+            continue
+        host, segment = match.group(1), match.group(2)
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            tokens.add(".".join(labels[i:]))
+        for label in labels[:-1]:
+            if label not in IGNORED_LABELS:
+                tokens.add(label)
+        if segment:
+            bare = host[4:] if host.startswith("www.") else host
+            tokens.add(f"{bare}/{segment}")
+    return tokens
+
+
+class ReferenceIndex:
+    """
+    Inverted index from reference tokens to store slots, updated one record
+    at a time.
+
+    Postings are append-only (slot << 32 | version) values. Every add or
+    remove bumps the slot's version, which retires its older postings
+    without touching them; lookups keep only postings whose version is
+    current and rewrite a posting list once most of it is stale. Callers
+    serialize writes and lookups (the dataset lock).
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.versions = array("I")
+
+    def _bump(self, slot):
+        if slot >= len(self.versions):
+            self.versions.extend([0] * (slot + 1 - len(self.versions)))
+        self.versions[slot] = (self.versions[slot] + 1) & 0xFFFFFFFF
+        return self.versions[slot]
+
+    def add(self, slot, record):
+        """Index the references of the record now stored in `slot`."""
+        version = self._bump(slot)
+        posting = (slot << 32) | version
+        for token in reference_tokens(record.get("references")):
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = array("Q")
+            postings.append(posting)
+
+    def remove(self, slot):
+        """Forget the record in `slot`; its postings go stale."""
+        if slot < len(self.versions):
+            self._bump(slot)
+
+    def lookup(self, token):
+        """Sorted slots whose current references contain `token`."""
+        postings = self.postings.get(token)
+        if postings is None:
+            return np.array([], dtype=np.int64)
+        values = np.frombuffer(postings.tobytes(), dtype=np.uint64)
+        slots = (values >> np.uint64(32)).astype(np.int64)
+        versions = (values & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+        current = np.frombuffer(self.versions.tobytes(), dtype=np.uint32)
+        valid = versions == current[slots]
+        if valid.sum() * 2 < len(values):
+            kept = values[valid]
+            if len(kept):
+                self.postings[token] = array("Q", kept.tobytes())
+            else:
+                del self.postings[token]
+        return np.unique(slots[valid])
+
+
+# --- Snapshot Scans ---
+def id_prefix_positions(snapshot, prefix):
+    """
+    Positions of live CVEs whose id starts with `prefix`. Regular ids are
+    matched on the year/seq columns: each digit prefix is a numeric range
+    per id width, so no per-row string is built.
+    """
+    prefix = normalize_id_prefix(prefix)
+    live = snapshot.columns["live"]
+    odd = [p for p, cve_id in snapshot.odd_ids.items() if live[p] and cve_id.upper().startswith(prefix)]
+
+    match = ID_PREFIX_PATTERN.fullmatch(prefix)
+    year_digits = (match.group(1) or "") if match else ""
+    seq_digits = match.group(2) if match else None
+    if not match or (seq_digits is not None and len(year_digits) != 4):
+        return np.array(sorted(odd), dtype=np.int64)
+
+    years = snapshot.columns["year"].astype(np.int64)
+    mask = live & (years > 0)
+    if year_digits:
+        width = 10 ** (4 - len(year_digits))
+        low = int(year_digits) * width
+        mask &= (years >= low) & (years < low + width)
+    if seq_digits:
+        seqs = snapshot.columns["seq"].astype(np.int64)
+        value, digits = int(seq_digits), len(seq_digits)
+        seq_mask = np.zeros(len(seqs), dtype=bool)
+        # Ids print seq zero-padded to 4 digits, longer ones without padding
+        for length in range(max(4, digits), 10):
+            width = 10 ** (length - digits)
+            in_length = seqs < 10 ** 4 if length == 4 else (seqs >= 10 ** (length - 1)) & (seqs < 10 ** length)
+            seq_mask |= in_length & (seqs >= value * width) & (seqs < (value + 1) * width)
+        mask &= seq_mask
+    mask[odd] = True
+    return np.flatnonzero(mask)
+
+
+def reference_substring_positions(snapshot, text, candidates=None):
+    """
+    Positions of live CVEs with `text` in one of their reference URLs,
+    case-insensitive. Few candidates are checked row by row; otherwise
+    the shared reference blob is scanned once, skipping to the end of a
+    row after its first hit.
+    """
+    needle = text.strip().lower().encode("utf-8")
+    starts = snapshot.columns["ref_start"]
+    lengths = snapshot.columns["ref_len"]
+    rows = np.flatnonzero(snapshot.columns["live"] & (lengths > 0))
+    if candidates is not None:
+        rows = np.intersect1d(rows, candidates)
+    if not needle or not len(rows):
+        return np.array([], dtype=np.int64)
+
+    blob = snapshot.blob
+    if len(rows) <= ROW_SCAN_LIMIT:
+        found = [p for p, start, length in zip(rows.tolist(), starts[rows].tolist(), lengths[rows].tolist())
+                 if needle in blob[start:start + length].lower()]
+        return np.array(found, dtype=np.int64)
+
+    rows = rows[np.argsort(starts[rows], kind="stable")]
+    row_starts = starts[rows].tolist()
+    row_ends = (starts[rows] + lengths[rows]).tolist()
+    pattern = re.compile(re.escape(needle), re.IGNORECASE)
+    found = []
+    pos = 0
+    while True:
+        hit = pattern.search(blob, pos)
+        if hit is None:
+            break
+        i = bisect_right(row_starts, hit.start()) - 1
+        if i >= 0 and hit.end() <= row_ends[i]:
+            found.append(int(rows[i]))
+            pos = row_ends[i]
+        else:
+            # Bytes of a deleted or replaced row, or of a row added after the snapshot
+            pos = hit.start() + 1
+    return np.array(sorted(found), dtype=np.int64)
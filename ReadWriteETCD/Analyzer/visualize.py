@@ -1,26 +1,63 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Query
-from fastapi.responses import HTMLResponse, StreamingResponse
-from io import StringIO
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-import etcd3
+import asyncio
+import base64
+import contextvars
+import cProfile
+import html
+import io
+import itertools
 import json
+import logging
+import os
+import pstats
+import random
+import sys
+import time
+import numpy as np
 import pandas as pd
 import plotly.express as px
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
 from dateutil.parser import parse
 import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared etcd storage helpers live in ReadWriteETCD/cvestore
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cvestore import REGISTRY, EtcdPool, counter, gauge, histogram, parse_endpoints
+from cvestore.metrics import CONTENT_TYPE
+from columnar import DAY_COLUMNS
+from dataset import CveDataset
+from broadcast import Broadcaster
+from cache import (ResponseCache, cache_key, choose_encoding, compress_variants, etag_matches,
+                   make_etag, variant_etag)
+from export import EXPORT_FORMATS, iter_chunks, pyarrow_available, select_rows
+from search import (classify_query, host_token, id_prefix_positions, reference_substring_positions,
+                    url_host)
 
 # --- FastAPI App ---
 app = FastAPI(title="ThreatView CVE - Made by Team 1")
+# Everything not precompressed below (index page, exports, errors) is gzipped on the fly
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # --- etcd Connection ---
-etcd = etcd3.client(
-    host="10.0.0.11",
-    port=2379,
+# Reads are spread over every member of the cluster and fail over when one is down
+ETCD_ENDPOINTS = os.environ.get("ETCD_ENDPOINTS", "10.0.0.11:2379,10.0.0.12:2379,10.0.0.13:2379")
+# The dataset is loaded with one ranged read of roughly 250 bytes per CVE,
+# far over gRPC's 4 MiB default once the full NVD history is stored
+ETCD_MAX_RECEIVE_BYTES = int(os.environ.get("ETCD_MAX_RECEIVE_BYTES", 512 * 1024 * 1024))
+
+etcd = EtcdPool(
+    parse_endpoints(ETCD_ENDPOINTS),
     ca_cert="/opt/cfssl/ca.pem",
     cert_cert="/opt/cfssl/etcd.pem",
     cert_key="/opt/cfssl/etcd-key.pem",
-    timeout=10
+    timeout=10,
+    max_receive_bytes=ETCD_MAX_RECEIVE_BYTES
 )
 
 # --- Basic Auth Setup ---
@@ -40,21 +77,512 @@ def get_current_user(credentials: HTTPBasicCredentials = Depends(security)):
         )
     return credentials.username
 
-# --- Helper Functions ---
-def load_all_cves():
-    cves = []
-    for value, metadata in etcd.get_prefix("/vulns/cve/analyzed/"):
+# --- CVE Dataset ---
+# Loaded once at startup and kept current by an etcd watch; handlers never read etcd
+dataset = CveDataset(etcd)
+
+@app.on_event("startup")
+def start_dataset():
+    if PROFILE_DIR:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+    dataset.start()
+
+@app.on_event("shutdown")
+def stop_dataset():
+    dataset.stop()
+    render_executor.shutdown(wait=False, cancel_futures=True)
+
+# --- Metrics and Profiling ---
+# Prometheus text format on /metrics. etcd reads, dataset loads and DataFrame
+# builds are measured where they happen (cvestore, dataset.py, columnar.py)
+# and land in the same registry. With WEB_WORKERS > 1 a scrape reads the
+# registry of whichever worker answers it.
+REQUEST_SECONDS = histogram("analyzer_request_seconds", "Seconds until the response was fully sent, by route",
+                            ["route", "method", "status"])
+RENDER_SECONDS = histogram("analyzer_render_seconds", "Seconds to render a cacheable response, by route", ["route"])
+FIGURE_SECONDS = histogram("analyzer_figure_render_seconds", "Seconds to build and serialize a Plotly figure",
+                           ["chart"])
+CACHE_LOOKUPS = counter("analyzer_response_cache_lookups_total", "Response cache lookups, by result", ["result"])
+RENDERS_REJECTED = counter("analyzer_renders_rejected_total", "Blocking work refused or given up on, by reason",
+                           ["reason"])
+RENDERS_IN_FLIGHT = gauge("analyzer_renders_in_flight", "Blocking calls holding a render slot")
+DATASET_CVES = gauge("analyzer_dataset_cves", "CVEs in the in-memory dataset")
+DATASET_REVISION = gauge("analyzer_dataset_revision", "etcd revision the dataset reflects")
+
+# Setting PROFILE_DIR turns on profiling: requests sent with "X-Profile: 1",
+# plus a PROFILE_SAMPLE share of all requests, run their blocking work under
+# cProfile, skipping the response and figure caches. Stats go to PROFILE_DIR as .prof
+# files and the top PROFILE_TOP entries are logged.
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "")
+PROFILE_SAMPLE = float(os.environ.get("PROFILE_SAMPLE", "0"))
+PROFILE_TOP = 15
+
+profile_label = contextvars.ContextVar("profile_label", default=None)
+profile_ids = itertools.count(1)
+renders_in_flight = 0
+
+def route_path(scope):
+    """Route template of a request, so /chart/x?date=... is one label."""
+    return getattr(scope.get("route"), "path", "unmatched")
+
+class RequestInstrumentation:
+    """
+    ASGI middleware timing every request until its last body chunk is sent,
+    so streamed exports count in full, and picking requests to profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if PROFILE_DIR and ((b"x-profile", b"1") in scope["headers"] or random.random() < PROFILE_SAMPLE):
+            profile_label.set(scope["path"])
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
         try:
-            cves.append(json.loads(value.decode()))
-        except:
-            continue
-    return pd.DataFrame(cves)
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, route=route_path(scope),
+                                    method=scope["method"], status=status_code)
+
+app.add_middleware(RequestInstrumentation)
+
+def dump_profile(profiler, label):
+    name = label.strip("/").replace("/", "_") or "index"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(profile_ids)}-{name}.prof")
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    logging.info(f"[PROFILE] {label} -> {path}\n{out.getvalue()}")
+
+def profiled(func, label):
+    """`func` run under cProfile, its stats dumped under `label` once it returns."""
+    def run(*args):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args)
+        finally:
+            profiler.disable()
+            dump_profile(profiler, label)
+    return run
+
+@app.get("/metrics")
+async def metrics(user: str = Depends(get_current_user)):
+    DATASET_CVES.set(len(dataset.store))
+    DATASET_REVISION.set(dataset.revision)
+    RENDERS_IN_FLIGHT.set(renders_in_flight)
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
+# --- Blocking Work ---
+# Dataset reads, pandas and Plotly run on a bounded thread pool so the event
+# loop keeps serving other requests. Work beyond MAX_PENDING_RENDERS waits for
+# a slot, and anything not done within REQUEST_TIMEOUT is answered with an error.
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "4"))
+MAX_PENDING_RENDERS = int(os.environ.get("MAX_PENDING_RENDERS", "32"))
+REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", "30"))
+
+render_executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+render_slots = asyncio.Semaphore(MAX_PENDING_RENDERS)
+
+async def run_blocking(func, *args):
+    """Run `func(*args)` on the render pool, bounded by the slot limit and REQUEST_TIMEOUT."""
+    global renders_in_flight
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + REQUEST_TIMEOUT
+    try:
+        await asyncio.wait_for(render_slots.acquire(), timeout=REQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        RENDERS_REJECTED.inc(reason="busy")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Máy chủ đang bận, vui lòng thử lại sau")
+
+    label = profile_label.get()
+    if label is not None:
+        func = profiled(func, label)
+    # The slot is held until the work really finishes, even if the request gave up on it
+    renders_in_flight += 1
+    # In the request's context, like asyncio.to_thread, so the work sees profile_label
+    future = loop.run_in_executor(render_executor, contextvars.copy_context().run, func, *args)
+    future.add_done_callback(release_render_slot)
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout=max(deadline - loop.time(), 0))
+    except asyncio.TimeoutError:
+        RENDERS_REJECTED.inc(reason="timeout")
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Xử lý yêu cầu quá thời gian")
+
+def release_render_slot(_):
+    global renders_in_flight
+    renders_in_flight -= 1
+    render_slots.release()
+
+# --- Response Cache ---
+# Rendered responses only depend on the query and the dataset revision, so
+# they are reused until new data arrives and revalidated with ETags
+RESPONSE_CACHE_ENTRIES = int(os.environ.get("RESPONSE_CACHE_ENTRIES", "128"))
+RESPONSE_CACHE_MB = int(os.environ.get("RESPONSE_CACHE_MB", "64"))
+
+response_cache = ResponseCache(RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_MB * 1024 * 1024)
+
+def render_body(render, route):
+    with RENDER_SECONDS.time(route=route):
+        body = render()
+        if not isinstance(body, (str, bytes)):
+            body = json.dumps(body, separators=(",", ":"), ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        return body, compress_variants(body)
+
+def send_entry(request, entry, cache_control="no-cache"):
+    """
+    Response for a cache entry: the best precompressed variant the client
+    accepts, or a 304 when its If-None-Match already has that variant.
+    """
+    body, etag, media_type, variants = entry
+    encoding = choose_encoding(request.headers.get("accept-encoding"), variants)
+    etag = variant_etag(etag, encoding)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding is not None:
+        body = variants[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+async def cached_response(request, render, media_type="text/html; charset=utf-8"):
+    """
+    Serve `render()` through the response cache. A matching If-None-Match
+    gets a 304 without rendering when the entry is still cached; otherwise
+    rendering and compression run on the render pool.
+    """
+    key = cache_key(request.url.path, request.query_params.multi_items(), dataset.revision)
+    # A profiled request always renders; a cache hit would show nothing
+    entry = response_cache.get(key) if profile_label.get() is None else None
+    CACHE_LOOKUPS.inc(result="miss" if entry is None else "hit")
+    if entry is None:
+        body, variants = await run_blocking(render_body, render, route_path(request.scope))
+        entry = response_cache.put(key, body, media_type, variants)
+    return send_entry(request, entry)
+
+# --- Figure Fragments ---
+# Figures are cached by the data they show, so pages whose query differs but
+# resolves to the same figure (e.g. date ranges ending on the same latest day)
+# share one rendering. plotly.js itself is served once from /static.
+PLOTLY_JS_URL = f"/static/plotly-{get_plotlyjs_version()}.min.js"
+PLOTLY_SCRIPT = f'<script src="{PLOTLY_JS_URL}" charset="utf-8"></script>'
+
+fragment_cache = ResponseCache(RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_MB * 1024 * 1024)
+plotly_js_entry = None
+
+def figure_html(key, build):
+    """HTML fragment of the figure `build()` returns, cached per data revision under `key`."""
+    cache_id = (key, dataset.revision)
+    entry = fragment_cache.get(cache_id) if profile_label.get() is None else None
+    if entry is None:
+        with FIGURE_SECONDS.time(chart=key[0]):
+            html = build().to_html(full_html=False, include_plotlyjs=False, div_id="chart")
+        entry = fragment_cache.put(cache_id, html.encode("utf-8"), "text/html")
+    return PLOTLY_SCRIPT + entry[0].decode("utf-8")
+
+def build_plotly_js_entry():
+    body = get_plotlyjs().encode("utf-8")
+    return (body, make_etag(body), "application/javascript; charset=utf-8",
+            compress_variants(body, gzip_level=9, brotli_quality=9))
+
+@app.get(PLOTLY_JS_URL)
+async def plotly_js(request: Request):
+    # Versioned URL, so browsers may keep it for a year without revalidating
+    global plotly_js_entry
+    if plotly_js_entry is None:
+        plotly_js_entry = await run_blocking(build_plotly_js_entry)
+    return send_entry(request, plotly_js_entry, cache_control="public, max-age=31536000, immutable")
+
+# --- Helper Functions ---
+def day_column(date_field):
+    """Typed day column for a date field name from the query string."""
+    if date_field not in DAY_COLUMNS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Trường ngày không hợp lệ: {date_field}")
+    return DAY_COLUMNS[date_field]
+
+def load_top_cves(date_field, day, severities=None, limit=None):
+    """
+    CVEs whose `date_field` day is `day`, highest score first, read from
+    the snapshot's day index; only the returned rows are decoded.
+    """
+    day_column(date_field)
+    snapshot = dataset.snapshot()
+    return snapshot.frame(snapshot.day_index(date_field).top(day, severities, limit), references=False)
+
+def load_rollups(date_field):
+    """Daily severity rollup rows for `date_field`."""
+    day_column(date_field)
+    rollups = dataset.rollups()
+    return rollups[rollups["dateField"] == date_field]
+
+def load_available_days(date_field):
+    """Sorted list of days that have CVEs for `date_field`."""
+    day_column(date_field)
+    return dataset.snapshot().day_index(date_field).days
+
+def severity_counts(date_field, from_day, to_day):
+    """Count per severity of CVEs whose `date_field` day is in [from_day, to_day], from the rollups."""
+    rollups = load_rollups(date_field)
+    rollups = rollups[(rollups["day"] >= pd.Timestamp(from_day)) & (rollups["day"] <= pd.Timestamp(to_day))]
+    count = rollups.groupby("severity")["count"].sum().sort_values(ascending=False).reset_index()
+    count.columns = ["Severity", "Count"]
+    return count
+
+# --- Dashboard API ---
+def count_rows(count):
+    """Severity/Count frame as compact [severity, count] pairs."""
+    return [[sev, int(n)] for sev, n in zip(count["Severity"], count["Count"])]
+
+def dashboard_data(top_n=10):
+    """Data for the four dashboard charts, built from one read of the rollups and the frame."""
+    rollups = dataset.rollups()
+    data = {"severityRecent": None, "severityDistribution": None, "trend": {}, "latestCves": None}
+
+    # Số CVE mỗi ngày theo từng trường ngày; dùng chung cho cả bốn biểu đồ
+    daily = rollups.groupby(["dateField", "day"])["count"].sum().reset_index().sort_values("day")
+    for field in DAY_COLUMNS:
+        rows = daily[daily["dateField"] == field]
+        data["trend"][field] = {
+            "days": rows["day"].dt.strftime("%Y-%m-%d").tolist(),
+            "counts": rows["count"].astype(int).tolist(),
+        }
+
+    published = data["trend"]["datePublished"]["days"]
+    modified = data["trend"]["dateModified"]["days"]
+
+    if published:
+        latest = published[-1]
+        data["severityRecent"] = {
+            "dateField": "datePublished",
+            "day": latest,
+            "counts": count_rows(severity_counts("datePublished", latest, latest)),
+        }
+
+        latest_day = pd.Timestamp(latest).date()
+        df = load_top_cves("datePublished", latest_day, limit=top_n)
+        data["latestCves"] = {
+            "dateField": "datePublished",
+            "day": latest,
+            "cves": [
+                [cve_id, None if pd.isna(score) else round(float(score), 1), None if pd.isna(sev) else str(sev)]
+                for cve_id, score, sev in zip(df["cveId"], df["baseScore"], df["baseSeverity"])
+            ],
+        }
+
+    if modified:
+        data["severityDistribution"] = {
+            "dateField": "dateModified",
+            "from": modified[0],
+            "to": modified[-1],
+            "counts": count_rows(severity_counts("dateModified", modified[0], modified[-1])),
+        }
+
+    return data
+
+@app.get("/api/dashboard")
+async def dashboard(
+    request: Request,
+    user: str = Depends(get_current_user),
+    top_n: int = Query(default=10, ge=1, le=100, alias="limit")
+):
+    return await cached_response(request, lambda: dashboard_data(top_n), media_type="application/json")
+
+# --- Dashboard Events ---
+# The index page listens on /api/events instead of polling. One broadcaster,
+# woken by the dataset's watch, builds the dashboard data once per revision
+# for every viewer and pushes only what changed: a full "dashboard" event on
+# connect, then "update" events. DASHBOARD_PUSH_INTERVAL seconds at least
+# separate two updates, so a crawler batch arrives as one.
+DASHBOARD_PUSH_INTERVAL = float(os.environ.get("DASHBOARD_PUSH_INTERVAL", "2"))
+
+def trend_delta(old, new):
+    """Days whose count changed, per date field; a count of 0 means the day is gone."""
+    delta = {}
+    for field, series in new.items():
+        before = dict(zip(old.get(field, {}).get("days", []), old.get(field, {}).get("counts", [])))
+        after = dict(zip(series["days"], series["counts"]))
+        days = sorted(day for day in before.keys() | after.keys() if before.get(day) != after.get(day))
+        if days:
+            delta[field] = {"days": days, "counts": [after.get(day, 0) for day in days]}
+    return delta
+
+def dashboard_delta(old, new):
+    """The parts of dashboard_data that changed between `old` and `new`, or None."""
+    delta = {key: new[key] for key in ("severityRecent", "severityDistribution", "latestCves") if old[key] != new[key]}
+    trend = trend_delta(old["trend"], new["trend"])
+    if trend:
+        delta["trend"] = trend
+    return delta or None
+
+async def build_dashboard():
+    return await run_blocking(dashboard_data)
+
+broadcaster = Broadcaster(build_dashboard, lambda: dataset.revision, dashboard_delta,
+                          min_interval=DASHBOARD_PUSH_INTERVAL)
+
+@app.on_event("startup")
+async def start_broadcaster():
+    broadcaster.start()
+    dataset.add_listener(broadcaster.notify)
+
+@app.on_event("shutdown")
+def stop_broadcaster():
+    broadcaster.stop()
+
+@app.get("/api/events")
+async def dashboard_events(request: Request, user: str = Depends(get_current_user)):
+    return StreamingResponse(
+        broadcaster.stream(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        # Proxies such as nginx must pass events on as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- CVE List API ---
+CVE_PAGE_COLUMNS = ["cveId", "day", "baseScore", "baseSeverity", "references"]
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(":".join(str(part) for part in key).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        key = tuple(int(part) for part in text.split(":"))
+    except ValueError:
+        key = ()
+    if len(key) != 5:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor không hợp lệ")
+    return key
+
+def cve_page(date_field, from_day, to_day, severities, after, page_size):
+    """One keyset page of CVEs, newest day first, then by score and CVE id."""
+    snapshot = dataset.snapshot()
+    positions, next_key = snapshot.day_index(date_field).page(from_day, to_day, severities, after, page_size)
+    return {
+        "columns": CVE_PAGE_COLUMNS,
+        "items": cve_items(snapshot, positions, date_field),
+        "next": None if next_key is None else encode_cursor(next_key),
+    }
+
+def cve_items(snapshot, positions, date_field):
+    """Rows of CVE_PAGE_COLUMNS for `positions`, in order."""
+    df = snapshot.frame(positions)
+    return [
+        [cve_id, None if pd.isna(day) else day.strftime("%Y-%m-%d"),
+         None if pd.isna(score) else round(float(score), 1), None if pd.isna(sev) else str(sev), refs]
+        for cve_id, day, score, sev, refs in zip(
+            df["cveId"], df[DAY_COLUMNS[date_field]], df["baseScore"], df["baseSeverity"], df["references"])
+    ]
 
-def parse_date_safe(date_str):
+@app.get("/api/cves")
+async def api_cves(
+    request: Request,
+    user: str = Depends(get_current_user),
+    from_date: str = Query(default=None),
+    to_date: str = Query(default=None),
+    severity_filter: list[str] = Query(default=["all"], alias="severity"),
+    date_field: str = Query(default="datePublished"),
+    page_size: int = Query(default=50, ge=1, le=500, alias="limit"),
+    cursor: str = Query(default=None)
+):
+    day_column(date_field)
     try:
-        return parse(date_str).date()
-    except Exception:
-        return None
+        from_day = parse(from_date).date() if from_date else None
+        to_day = parse(to_date).date() if to_date else None
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Lỗi định dạng ngày tháng.")
+    after = decode_cursor(cursor) if cursor else None
+
+    severities = None
+    if "all" not in [s.lower() for s in severity_filter]:
+        severities = [s.upper() for s in severity_filter]
+
+    return await cached_response(
+        request, lambda: cve_page(date_field, from_day, to_day, severities, after, page_size),
+        media_type="application/json")
+
+# --- Search API ---
+SEARCH_KINDS = ["auto", "id", "host", "url"]
+
+def search_cves(query, kind, date_field, from_day, to_day, severities, limit):
+    """
+    CVEs matching `query`, newest day first: an id prefix, a reference host
+    or vendor (inverted index), or a substring of a reference URL.
+    """
+    if kind == "auto":
+        kind = classify_query(query)
+    token = host_token(query) if kind == "host" else url_host(query) if kind == "url" else None
+    if token is not None:
+        # Index lookup and snapshot are taken together so positions line up
+        snapshot, indexed = dataset.lookup_references(token)
+    else:
+        snapshot, indexed = dataset.snapshot(), None
+    if kind == "host" and not len(indexed):
+        # Not a whole token (a partial host or path); look for it as text
+        kind, indexed = "url", None
+    filtered = None
+    if from_day is not None or to_day is not None or severities is not None:
+        filtered = snapshot.select(date_field, from_day, to_day, severities)
+
+    if kind == "id":
+        matches = id_prefix_positions(snapshot, query)
+    elif kind == "host":
+        matches = indexed
+    else:
+        # The host index and a narrow date range leave few rows to check one by one
+        candidates = filtered if indexed is None else indexed if filtered is None else np.intersect1d(indexed, filtered)
+        matches = reference_substring_positions(snapshot, query, candidates)
+    if filtered is not None:
+        matches = np.intersect1d(matches, filtered, assume_unique=True)
+
+    ordered = snapshot.order_by_day_score(matches, date_field, newest_first=True)
+    return {
+        "kind": kind,
+        "total": len(ordered),
+        "columns": CVE_PAGE_COLUMNS,
+        "items": cve_items(snapshot, ordered[:limit], date_field),
+    }
+
+@app.get("/api/search")
+async def api_search(
+    request: Request,
+    user: str = Depends(get_current_user),
+    query: str = Query(min_length=2, max_length=200, alias="q"),
+    kind: str = Query(default="auto"),
+    from_date: str = Query(default=None),
+    to_date: str = Query(default=None),
+    severity_filter: list[str] = Query(default=["all"], alias="severity"),
+    date_field: str = Query(default="datePublished"),
+    limit: int = Query(default=50, ge=1, le=500)
+):
+    day_column(date_field)
+    if kind not in SEARCH_KINDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Kiểu tìm kiếm không hợp lệ: {kind}")
+    try:
+        from_day = parse(from_date).date() if from_date else None
+        to_day = parse(to_date).date() if to_date else None
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Lỗi định dạng ngày tháng.")
+
+    severities = None
+    if "all" not in [s.lower() for s in severity_filter]:
+        severities = [s.upper() for s in severity_filter]
+
+    return await cached_response(
+        request, lambda: search_cves(query, kind, date_field, from_day, to_day, severities, limit),
+        media_type="application/json")
 
 # --- Web UI ---
 @app.get("/", response_class=HTMLResponse)
@@ -93,55 +621,173 @@ async def index():
                 font-weight: bold;
             }
         </style>
+        """ + PLOTLY_SCRIPT + """
         <script>
-            let refreshInterval = null;
+            let events = null;
+            let dashboard = null;
+            let lastEtag = null;
+            const TREND_LABELS = {datePublished: "Công bố", dateModified: "Cập nhật"};
+            const SEVERITY_COLORS = {CRITICAL: "#d62728", HIGH: "#ff7f0e", MEDIUM: "#f2c318", LOW: "#2ca02c", NONE: "#7f7f7f"};
+            const PLOT_CONFIG = {responsive: true, displaylogo: false};
+
+            function drawEmpty(id, message) {
+                document.getElementById(id).innerHTML = "<div class='alert alert-warning'>" + message + "</div>";
+            }
+            function drawSeverityRecent(data) {
+                if (!data) return drawEmpty("severity_recent", "Không có dữ liệu CVE nào.");
+                Plotly.react("severity_recent", [{
+                    type: "bar",
+                    x: data.counts.map(r => r[0]),
+                    y: data.counts.map(r => r[1]),
+                    marker: {color: data.counts.map(r => SEVERITY_COLORS[r[0]])}
+                }], {
+                    title: {text: "Thống kê CVE xuất hiện trong ngày gần nhất có dữ liệu: " + data.day},
+                    xaxis: {title: {text: "Mức độ"}}, yaxis: {title: {text: "Số lượng"}}
+                }, PLOT_CONFIG);
+            }
+            function drawSeverityDistribution(data) {
+                if (!data) return drawEmpty("severity_distribution", "Không có dữ liệu CVE nào.");
+                Plotly.react("severity_distribution", [{
+                    type: "pie",
+                    labels: data.counts.map(r => r[0]),
+                    values: data.counts.map(r => r[1]),
+                    marker: {colors: data.counts.map(r => SEVERITY_COLORS[r[0]])}
+                }], {
+                    title: {text: "Phân bố mức độ nghiêm trọng CVE (" + data.from + " → " + data.to + ")"}
+                }, PLOT_CONFIG);
+            }
+            function drawTrend(data) {
+                const traces = Object.keys(TREND_LABELS).map(field => ({
+                    type: "scatter", mode: "lines+markers", name: TREND_LABELS[field],
+                    x: data[field].days, y: data[field].counts
+                }));
+                Plotly.react("cve_trend", traces, {
+                    title: {text: "Xu hướng công bố và cập nhật CVE theo thời gian"},
+                    xaxis: {title: {text: "Mốc thời gian"}}, yaxis: {title: {text: "Số lượng CVE"}},
+                    legend: {title: {text: "Loại"}}
+                }, PLOT_CONFIG);
+            }
+            function drawLatestCves(data) {
+                if (!data) return drawEmpty("latest_cves", "Không có dữ liệu CVE nào.");
+                Plotly.react("latest_cves", [{
+                    type: "bar", orientation: "h",
+                    x: data.cves.map(r => r[1]),
+                    y: data.cves.map(r => r[0]),
+                    text: data.cves.map(r => r[2]),
+                    marker: {color: data.cves.map(r => SEVERITY_COLORS[r[2]] || SEVERITY_COLORS.NONE)}
+                }], {
+                    title: {text: "Top " + data.cves.length + " CVE (" + data.day + ")"},
+                    xaxis: {title: {text: "Mức điểm"}}, yaxis: {title: {text: "Mã CVE"}, autorange: "reversed"},
+                    margin: {l: 160}
+                }, PLOT_CONFIG);
+            }
+            function drawDashboard(data) {
+                drawSeverityRecent(data.severityRecent);
+                drawSeverityDistribution(data.severityDistribution);
+                drawTrend(data.trend);
+                drawLatestCves(data.latestCves);
+            }
+            function showCharts() {
+                document.getElementById("loadError").classList.add("d-none");
+                document.getElementById("loadingOverlay").classList.add("hidden");
+                document.getElementById("chartWrapper").classList.add("visible");
+            }
+            function mergeTrend(series, change) {
+                // Ngày có số lượng 0 là ngày không còn CVE nào
+                const counts = new Map(series.days.map((day, i) => [day, series.counts[i]]));
+                change.days.forEach((day, i) => change.counts[i] ? counts.set(day, change.counts[i]) : counts.delete(day));
+                const days = [...counts.keys()].sort();
+                return {days: days, counts: days.map(day => counts.get(day))};
+            }
+            function applyUpdate(delta) {
+                if (!dashboard) return;
+                if (delta.trend) {
+                    Object.keys(delta.trend).forEach(field => {
+                        dashboard.trend[field] = mergeTrend(dashboard.trend[field] || {days: [], counts: []}, delta.trend[field]);
+                    });
+                    drawTrend(dashboard.trend);
+                }
+                if ("severityRecent" in delta) drawSeverityRecent(dashboard.severityRecent = delta.severityRecent);
+                if ("severityDistribution" in delta) drawSeverityDistribution(dashboard.severityDistribution = delta.severityDistribution);
+                if ("latestCves" in delta) drawLatestCves(dashboard.latestCves = delta.latestCves);
+            }
             function refreshCharts(initial = false) {
                 const overlay = document.getElementById("loadingOverlay");
                 const wrapper = document.getElementById("chartWrapper");
-                overlay.classList.remove("hidden");
-                wrapper.classList.remove("visible");
-                const now = new Date().getTime();
-                let remaining = 4;
-                const done = () => {
-                    remaining -= 1;
-                    if (remaining <= 0) {
-                        setTimeout(() => {
-                            overlay.classList.add("hidden");
-                            wrapper.classList.add("visible");
-                        }, 200);
+                if (initial) {
+                    overlay.classList.remove("hidden");
+                    wrapper.classList.remove("visible");
+                }
+                // Một request cho cả bốn biểu đồ; trình duyệt tự vẽ
+                // Trình duyệt gửi If-None-Match; dữ liệu không đổi thì server trả 304
+                return fetch("/api/dashboard", {cache: "no-cache"})
+                    .then(resp => {
+                        if (!resp.ok) throw new Error("HTTP " + resp.status);
+                        const etag = resp.headers.get("ETag");
+                        if (etag && etag === lastEtag) return null;
+                        lastEtag = etag;
+                        return resp.json();
+                    })
+                    .then(data => {
+                        showCharts();
+                        if (!data) return;
+                        dashboard = data;
+                        drawDashboard(data);
+                    })
+                    .catch(err => {
+                        overlay.classList.add("hidden");
+                        document.getElementById("loadError").textContent = "Không tải được dữ liệu: " + err.message;
+                        document.getElementById("loadError").classList.remove("d-none");
+                    });
+            }
+            function setLiveStatus(text, style) {
+                const badge = document.getElementById("liveStatus");
+                badge.textContent = text;
+                badge.className = "badge ms-2 text-bg-" + style;
+            }
+            function startLiveUpdates() {
+                // Server đẩy dữ liệu khi CVE thay đổi: toàn bộ khi kết nối, sau đó chỉ phần thay đổi
+                if (events) return;
+                events = new EventSource("/api/events");
+                setLiveStatus("Đang kết nối...", "secondary");
+                events.addEventListener("dashboard", e => {
+                    dashboard = JSON.parse(e.data);
+                    drawDashboard(dashboard);
+                    showCharts();
+                });
+                events.addEventListener("update", e => applyUpdate(JSON.parse(e.data)));
+                events.onopen = () => setLiveStatus("Trực tiếp", "success");
+                events.onerror = () => {
+                    if (events.readyState === EventSource.CLOSED) {
+                        // Trình duyệt không thử lại nữa; tải một lần như trước
+                        events = null;
+                        setLiveStatus("Mất kết nối", "danger");
+                        if (!dashboard) refreshCharts(true);
+                    } else {
+                        setLiveStatus("Đang kết nối lại...", "warning");
                     }
                 };
-                const iframes = [
-                    document.getElementById('severity_recent'),
-                    document.getElementById('severity_distribution'),
-                    document.getElementById('cve_trend'),
-                    document.getElementById('latest_cves')
-                ];
-                iframes.forEach(iframe => {
-                    iframe.onload = null;
-                    iframe.src = iframe.src.split('?')[0] + "?ts=" + now;
-                    iframe.onload = done;
-                });
-                setTimeout(() => {
-                    overlay.classList.add("hidden");
-                    wrapper.classList.add("visible");
-                }, 6000);
             }
-            function setAutoRefresh() {
-                if (refreshInterval) clearInterval(refreshInterval);
-                const val = document.getElementById('refreshInterval').value;
-                if (val === "30") {
-                    refreshInterval = setInterval(refreshCharts, 30000);
-                } else if (val === "60") {
-                    refreshInterval = setInterval(refreshCharts, 60000);
-                }
+            function stopLiveUpdates() {
+                if (events) events.close();
+                events = null;
+                setLiveStatus("Tắt", "secondary");
+            }
+            function setLiveUpdates() {
+                if (document.getElementById("liveUpdates").checked) startLiveUpdates();
+                else stopLiveUpdates();
             }
             function toggleTheme() {
                 const html = document.querySelector('html');
                 html.setAttribute('data-bs-theme', html.getAttribute('data-bs-theme') === 'dark' ? 'light' : 'dark');
             }
             window.onload = function () {
-                refreshCharts(true);
+                if (window.EventSource) {
+                    startLiveUpdates();
+                } else {
+                    document.getElementById("liveUpdates").disabled = true;
+                    refreshCharts(true);
+                }
             };
         </script>
     </head>
@@ -159,27 +805,30 @@ async def index():
                 <button class="btn btn-outline-secondary ms-2" onclick="toggleTheme()">🌓 Đổi giao diện</button>
             </div>
             <div>
-                <label for="refreshInterval" class="form-label me-2">Tự động làm mới:</label>
-                <select id="refreshInterval" class="form-select d-inline-block w-auto" onchange="setAutoRefresh()">
-                    <option value="none" selected>Tắt</option>
-                    <option value="30">30 giây</option>
-                    <option value="60">1 phút</option>
-                </select>
+                <div class="form-check form-switch d-inline-block">
+                    <input class="form-check-input" type="checkbox" id="liveUpdates" checked onchange="setLiveUpdates()">
+                    <label class="form-check-label" for="liveUpdates">Cập nhật trực tiếp</label>
+                </div>
+                <span id="liveStatus" class="badge ms-2 text-bg-secondary">Tắt</span>
             </div>
         </div>
+        <div id="loadError" class="alert alert-danger d-none"></div>
         <div id="chartWrapper" class="chart-wrapper">
             <div class="row g-4">
                 <div class="col-md-12">
-                    <iframe id="severity_recent" src="/chart/severity_recent" width="100%" height="400" frameborder="0"></iframe>
+                    <div id="severity_recent" style="height: 400px;"></div>
+                    <a href="/chart/severity_recent" target="_blank" class="small">Lọc theo ngày ↗</a>
                 </div>
                 <div class="col-md-12">
-                    <iframe id="severity_distribution" src="/chart/severity_distribution" width="100%" height="400" frameborder="0"></iframe>
+                    <div id="severity_distribution" style="height: 400px;"></div>
+                    <a href="/chart/severity_distribution" target="_blank" class="small">Lọc theo ngày ↗</a>
                 </div>
                 <div class="col-md-12">
-                    <iframe id="cve_trend" src="/chart/cve_trend" width="100%" height="400" frameborder="0"></iframe>
+                    <div id="cve_trend" style="height: 400px;"></div>
                 </div>
                 <div class="col-md-12">
-                    <iframe id="latest_cves" src="/chart/latest_cves" width="100%" height="600" frameborder="0"></iframe>
+                    <div id="latest_cves" style="height: 500px;"></div>
+                    <a href="/chart/latest_cves" target="_blank" class="small">Danh sách chi tiết và tải CSV ↗</a>
                 </div>
             </div>
         </div>
@@ -190,20 +839,22 @@ async def index():
 # --- Chart: Severity Recently ---
 @app.get("/chart/severity_recent", response_class=HTMLResponse)
 async def severity_recent(
+    request: Request,
     user: str = Depends(get_current_user),
     from_date: str = Query(default=None),
     to_date: str = Query(default=None),
     date_field: str = Query(default="datePublished")
 ):
-    df = load_all_cves()
-    df[date_field] = df[date_field].apply(parse_date_safe)
-    df = df.dropna(subset=[date_field])
+    return await cached_response(request, lambda: render_severity_recent(from_date, to_date, date_field))
 
-    if df.empty:
+def render_severity_recent(from_date, to_date, date_field):
+    days = load_available_days(date_field)
+
+    if not days:
         return "<div class='alert alert-warning'>Không có dữ liệu CVE nào.</div>"
 
-    min_date = df[date_field].min()
-    max_date = df[date_field].max()
+    min_date = days[0]
+    max_date = days[-1]
 
     try:
         from_dt = parse(from_date).date() if from_date else min_date
@@ -211,7 +862,8 @@ async def severity_recent(
     except:
         return "<div class='alert alert-danger'>Lỗi định dạng ngày tháng.</div>"
 
-    df = df[(df[date_field] >= from_dt) & (df[date_field] <= to_dt)]
+    # Only the latest day in range is charted
+    days_in_range = [d for d in days if from_dt <= d <= to_dt]
 
     from_date_val = from_date if from_date else str(min_date)
     to_date_val = to_date if to_date else str(max_date)
@@ -230,19 +882,18 @@ async def severity_recent(
         html_form += f"<option value='{field}' {selected}>{field}</option>"
     html_form += "</select><hr></form>"
 
-    if df.empty or "baseSeverity" not in df:
+    if not days_in_range:
         return html_form + f"<div class='alert alert-info'>Không có dữ liệu CVE từ {from_dt} đến {to_dt}.</div>"
 
-    latest_date = df[date_field].max()
-    latest_df = df[df[date_field] == latest_date]
+    latest_date = days_in_range[-1]
 
-    count = latest_df["baseSeverity"].value_counts().reset_index()
-    count.columns = ["Severity", "Count"]
-    fig = px.bar(count, x="Severity", y="Count",
-                 title=f"Thống kê CVE xuất hiện trong ngày gần nhất có dữ liệu: {latest_date}",
-                 color="Severity", template="plotly_white",
-                 labels={"Severity": "Mức độ", "Count": "Số lượng"})
-    html_chart = fig.to_html(full_html=False)
+    def build():
+        count = severity_counts(date_field, latest_date, latest_date)
+        return px.bar(count, x="Severity", y="Count",
+                      title=f"Thống kê CVE xuất hiện trong ngày gần nhất có dữ liệu: {latest_date}",
+                      color="Severity", template="plotly_white",
+                      labels={"Severity": "Mức độ", "Count": "Số lượng"})
+    html_chart = figure_html(("severity_recent", date_field, latest_date), build)
 
     return f"""
     <div style="background-color: white; padding: 1rem;">
@@ -254,20 +905,22 @@ async def severity_recent(
 # --- Chart: Severity Distribution ---
 @app.get("/chart/severity_distribution", response_class=HTMLResponse)
 async def severity_distribution(
+    request: Request,
     user: str = Depends(get_current_user),
     from_date: str = Query(default=None),
     to_date: str = Query(default=None),
     date_field: str = Query(default="dateModified")
 ):
-    df = load_all_cves()
-    df[date_field] = df[date_field].apply(parse_date_safe)
-    df = df.dropna(subset=[date_field])
+    return await cached_response(request, lambda: render_severity_distribution(from_date, to_date, date_field))
 
-    if df.empty:
+def render_severity_distribution(from_date, to_date, date_field):
+    days = load_available_days(date_field)
+
+    if not days:
         return "<div class='alert alert-warning'>Không có dữ liệu CVE nào.</div>"
 
-    min_date = df[date_field].min()
-    max_date = df[date_field].max()
+    min_date = days[0]
+    max_date = days[-1]
 
     try:
         from_dt = parse(from_date).date() if from_date else min_date
@@ -275,7 +928,7 @@ async def severity_distribution(
     except:
         return "<div class='alert alert-danger'>Lỗi định dạng ngày tháng.</div>"
 
-    df = df[(df[date_field] >= from_dt) & (df[date_field] <= to_dt)]
+    count = severity_counts(date_field, from_dt, to_dt)
 
     from_date_val = from_date if from_date else str(min_date)
     to_date_val = to_date if to_date else str(max_date)
@@ -294,16 +947,15 @@ async def severity_distribution(
         html_form += f"<option value='{field}' {selected}>{field}</option>"
     html_form += "</select><hr></form>"
 
-    if df.empty or "baseSeverity" not in df:
+    if count.empty:
         return html_form + f"<div class='alert alert-info'>Không có dữ liệu CVE từ {from_dt} đến {to_dt}.</div>"
 
-    count = df["baseSeverity"].value_counts().reset_index()
-    count.columns = ["Severity", "Count"]
-    fig = px.pie(count, names="Severity", values="Count",
-                 title=f"Phân bố mức độ nghiêm trọng CVE ({from_dt} → {to_dt})",
-                 color_discrete_sequence=px.colors.qualitative.Set3,
-                 labels={"Severity": "Mức độ", "Count": "Số lượng"})
-    html_chart = fig.to_html(full_html=False)
+    def build():
+        return px.pie(count, names="Severity", values="Count",
+                      title=f"Phân bố mức độ nghiêm trọng CVE ({from_dt} → {to_dt})",
+                      color_discrete_sequence=px.colors.qualitative.Set3,
+                      labels={"Severity": "Mức độ", "Count": "Số lượng"})
+    html_chart = figure_html(("severity_distribution", date_field, from_dt, to_dt), build)
 
     return f"""
     <div style="background-color: white; padding: 1rem;">
@@ -314,69 +966,107 @@ async def severity_distribution(
 
 # --- Chart: CVE Trend ---
 @app.get("/chart/cve_trend", response_class=HTMLResponse)
-async def cve_trend(user: str = Depends(get_current_user)):
-    df = load_all_cves()
-
-    # Chuyển đổi ngày an toàn
-    df["datePublished"] = df["datePublished"].apply(parse_date_safe)
-    df["dateModified"] = df["dateModified"].apply(parse_date_safe)
-
-    df = df.dropna(subset=["datePublished", "dateModified"])
+async def cve_trend(
+    request: Request,
+    user: str = Depends(get_current_user)
+):
+    return await cached_response(request, render_cve_trend)
 
-    # Group theo ngày công bố
-    pub_trend = df.groupby("datePublished").size().reset_index(name="count")
-    pub_trend["type"] = "Công bố"
+def render_cve_trend():
+    def build():
+        # Số CVE mỗi ngày, cộng từ bảng tổng hợp theo ngày
+        trend_df = dataset.rollups().groupby(["dateField", "day"])["count"].sum().reset_index()
+        trend_df["type"] = trend_df["dateField"].map({"datePublished": "Công bố", "dateModified": "Cập nhật"})
+        trend_df = trend_df.rename(columns={"day": "date"})
 
-    # Group theo ngày cập nhật
-    mod_trend = df.groupby("dateModified").size().reset_index(name="count")
-    mod_trend["type"] = "Cập nhật"
+        # Vẽ biểu đồ
+        return px.line(
+            trend_df,
+            x="date",
+            y="count",
+            color="type",
+            markers=True,
+            title="Xu hướng công bố và cập nhật CVE theo thời gian",
+            template="plotly_white",
+            labels={"date": "Mốc thời gian", "count": "Số lượng CVE", "type": "Loại"}
+        )
 
-    trend_df = pd.concat([pub_trend.rename(columns={"datePublished": "date"}),
-                          mod_trend.rename(columns={"dateModified": "date"})])
+    return figure_html(("cve_trend",), build)
 
-    # Vẽ biểu đồ
-    fig = px.line(
-        trend_df,
-        x="date",
-        y="count",
-        color="type",
-        markers=True,
-        title="Xu hướng công bố và cập nhật CVE theo thời gian",
-        template="plotly_white",
-        labels={"date": "Mốc thời gian", "count": "Số lượng CVE", "type": "Loại"}
-    )
+# --- Chart: Latest CVEs ---
+CVE_LIST_SCRIPT = """
+<script>
+(function () {
+    const list = document.getElementById("cveList");
+    const more = document.getElementById("moreCves");
+    const max = parseInt(list.dataset.max, 10);
+    const PAGE_SIZE = 50;
+    let shown = 0, cursor = null, done = false, loading = false;
 
-    return fig.to_html(full_html=False)
+    const ENTITIES = {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"};
+    function text(value) {
+        return value == null ? "" : String(value).replace(/[&<>"']/g, c => ENTITIES[c]);
+    }
+    function loadMore() {
+        if (loading || done) return;
+        loading = true;
+        const query = new URLSearchParams(list.dataset.query);
+        query.set("limit", max ? Math.min(PAGE_SIZE, max - shown) : PAGE_SIZE);
+        if (cursor) query.set("cursor", cursor);
+        fetch("/api/cves?" + query)
+            .then(resp => resp.json())
+            .then(page => {
+                const html = page.items.map(([id, day, score, severity, refs]) => {
+                    const links = refs.map(ref => "<a href='" + text(ref) + "' target='_blank'>" + text(ref) + "</a>").join("<br>");
+                    return "<li><strong>" + text(id) + "</strong> - " + text(severity) + " (" + score + ")" +
+                        "<details><summary>References</summary>" + links + "</details></li>";
+                });
+                list.insertAdjacentHTML("beforeend", html.join(""));
+                shown += page.items.length;
+                cursor = page.next;
+                done = !cursor || (max && shown >= max);
+                more.style.display = done ? "none" : "";
+                loading = false;
+            })
+            .catch(() => { loading = false; });
+    }
+    more.onclick = loadMore;
+    new IntersectionObserver(entries => {
+        if (entries[0].isIntersecting) loadMore();
+    }).observe(more);
+    loadMore();
+})();
+</script>
+"""
 
-# --- Chart: Latest CVEs ---
 @app.get("/chart/latest_cves", response_class=HTMLResponse)
 async def latest_cves(
+    request: Request,
     user: str = Depends(get_current_user),
     selected_date: str = Query(default=None, alias="date"),
     top_n: int = Query(default=10, ge=1, le=9999, alias="limit"),
     severity_filter: list[str] = Query(default=["all"], alias="severity"),
-    date_field: str = Query(default="datePublished") 
+    date_field: str = Query(default="datePublished")
 ):
-    df = load_all_cves()
-
-    df[date_field] = df[date_field].apply(parse_date_safe) 
-    df = df.dropna(subset=[date_field]) 
+    return await cached_response(request, lambda: render_latest_cves(selected_date, top_n, severity_filter, date_field))
 
-    unique_dates = sorted(df[date_field].unique(), reverse=True) 
+def render_latest_cves(selected_date, top_n, severity_filter, date_field):
+    unique_dates = load_available_days(date_field)[::-1]
     if not unique_dates:
         return "<div class='alert alert-warning'>Không có dữ liệu CVE nào.</div>"
 
     chosen_date = parse(selected_date).date() if selected_date else unique_dates[0]
-    df = df[df[date_field] == chosen_date]             
-
+    severities = None
     if "all" not in [s.lower() for s in severity_filter]:
-        df = df[df["baseSeverity"].isin([s.upper() for s in severity_filter])]
-
-    df = df.sort_values("baseScore", ascending=False)
+        severities = [s.upper() for s in severity_filter]
 
     show_all = top_n not in [10, 20, 50, 100]
+    df = load_top_cves(date_field, chosen_date, severities, limit=None if show_all else top_n)
+    # Back to plain types for display: float32 scores would show as 7.5000...
+    df["baseSeverity"] = df["baseSeverity"].astype(str)
+    df["baseScore"] = df["baseScore"].astype("float64").round(1)
+
     if not show_all:
-        df = df.head(top_n)
         title_label = f"Top {top_n}"
     else:
         title_label = "Toàn bộ"
@@ -463,24 +1153,24 @@ async def latest_cves(
         return html_select_form + f"<div class='alert alert-info'>Không có CVE nào với mức độ đã chọn vào ngày {chosen_date}.</div>"
 
     # Biểu đồ
-    fig = px.bar(df, x="baseScore", y="cveId", orientation='h',
-                 title=f"{title_label} CVE ({chosen_date})",
-                 color="baseSeverity", template="plotly_white",
-                 labels={"cveId": "Mã CVE", "baseScore": "Mức điểm", "baseSeverity": "Mức độ"})
-    fig.update_layout(yaxis=dict(autorange="reversed"))
-    html_chart = fig.to_html(full_html=False)
-
-    # Danh sách chi tiết
-    html_table = "<div class='mt-3'><h5>Danh sách chi tiết:</h5><ul>"
-    for _, row in df.iterrows():
-        refs = "<br>".join([f"<a href='{ref}' target='_blank'>{ref}</a>" for ref in row.get("references", [])])
-        html_table += f"""
-        <li>
-            <strong>{row['cveId']}</strong> - {row['baseSeverity']} ({row['baseScore']})
-            <details><summary>References</summary>{refs}</details>
-        </li>
-        """
-    html_table += "</ul></div>"
+    def build():
+        fig = px.bar(df, x="baseScore", y="cveId", orientation='h',
+                     title=f"{title_label} CVE ({chosen_date})",
+                     color="baseSeverity", template="plotly_white",
+                     labels={"cveId": "Mã CVE", "baseScore": "Mức điểm", "baseSeverity": "Mức độ"})
+        fig.update_layout(yaxis=dict(autorange="reversed"))
+        return fig
+    html_chart = figure_html(("latest_cves", date_field, chosen_date, tuple(severities or ()), top_n), build)
+
+    # Danh sách chi tiết: tải từng trang qua /api/cves khi cuộn tới cuối
+    list_query = [("date_field", date_field), ("from_date", chosen_date), ("to_date", chosen_date)]
+    list_query += [("severity", s) for s in (severities or [])]
+    html_table = f"""
+    <div class='mt-3'><h5>Danh sách chi tiết:</h5>
+        <ul id="cveList" data-query="{html.escape(urlencode(list_query))}" data-max="{0 if show_all else top_n}"></ul>
+        <button id="moreCves" type="button" class="btn btn-sm btn-outline-primary">Tải thêm</button>
+    </div>
+    """ + CVE_LIST_SCRIPT
 
     return f"""
     <div style="background-color: white; padding: 1rem;">
@@ -491,39 +1181,57 @@ async def latest_cves(
     """
 
 @app.get("/export/cves")
-async def export_csv(
+async def export_cves(
     user: str = Depends(get_current_user),
     selected_date: str = Query(default=None, alias="date"),
-    top_n: int = Query(default=10, ge=1, le=9999, alias="limit"),
+    from_date: str = Query(default=None),
+    to_date: str = Query(default=None),
+    top_n: int = Query(default=None, ge=1, le=9999, alias="limit"),
     severity_filter: list[str] = Query(default=["all"], alias="severity"),
-    date_field: str = Query(default="datePublished")
+    date_field: str = Query(default="datePublished"),
+    export_format: str = Query(default="csv", alias="format")
 ):
-    df = load_all_cves()
-    df[date_field] = df[date_field].apply(parse_date_safe)
-    df = df.dropna(subset=[date_field])
+    day_column(date_field)
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Định dạng không hỗ trợ: {export_format}")
+    writer, media_type, extension, needs_pyarrow = EXPORT_FORMATS[export_format]
+    if needs_pyarrow and not pyarrow_available():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=f"Cần cài pyarrow để xuất {export_format}")
 
-    chosen_date = parse(selected_date).date() if selected_date else datetime.utcnow().date()
-    df = df[df[date_field] == chosen_date]
+    try:
+        if from_date or to_date:
+            # Date-range export: every CVE in range unless a limit is given
+            from_day = parse(from_date).date() if from_date else None
+            to_day = parse(to_date).date() if to_date else None
+        else:
+            # Single-day export, top 10 by default as the CVE list page offers
+            from_day = to_day = parse(selected_date).date() if selected_date else datetime.utcnow().date()
+            top_n = top_n or 10
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Lỗi định dạng ngày tháng.")
 
+    severities = None
     if "all" not in [s.lower() for s in severity_filter]:
-        df = df[df["baseSeverity"].isin([s.upper() for s in severity_filter])]
-
-    df = df.sort_values("baseScore", ascending=False)
+        severities = [s.upper() for s in severity_filter]
 
-    if top_n in [10, 20, 50, 100]:
-        df = df.head(top_n)
+    # Rows are picked by position on the columnar snapshot and decoded chunk by chunk
+    snapshot = dataset.snapshot()
+    positions = await run_blocking(select_rows, snapshot, date_field, from_day, to_day, severities)
+    if top_n:
+        positions = positions[:top_n]
 
-    output = StringIO()
-    df.to_csv(output, index=False)
-    output.seek(0)
-
-    filename = f"cves_{date_field}_{chosen_date}.csv"
-    return StreamingResponse(output, media_type="text/csv", headers={
+    if from_day is not None and from_day == to_day:
+        filename = f"cves_{date_field}_{from_day}.{extension}"
+    else:
+        filename = f"cves_{date_field}_{from_day or 'start'}_{to_day or 'end'}.{extension}"
+    return StreamingResponse(writer(iter_chunks(snapshot, positions, date_field), date_field), media_type=media_type, headers={
         "Content-Disposition": f"attachment; filename={filename}"
     })
 
 # --- Entry Point ---
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("visualize:app", host="0.0.0.0", port=80, reload=False)
+    # Each worker process holds its own watch-fed dataset and response cache
+    uvicorn.run("visualize:app", host="0.0.0.0", port=80, reload=False,
+                workers=int(os.environ.get("WEB_WORKERS", "1")))
 
@@ -0,0 +1,438 @@
+"""
+Benchmark the crawler and the analyzer on a synthetic CVE corpus.
+
+Every size runs in its own process against a local NVD stand-in (fake_nvd)
+and either an in-process etcd (fake_etcd, the default) or a local
+single-node etcd given with --etcd HOST:PORT. Each phase reports throughput,
+p50/p99 latency and peak RSS; results are written as JSON so runs can be
+compared with --compare.
+
+    python bench.py --sizes 1000,10000,100000
+    python bench.py --sizes 10000 --etcd 127.0.0.1:2379 --reset
+    python bench.py --sizes 10000 --compare results/<earlier run>.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+READWRITE_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+for path in (READWRITE_DIR, os.path.join(READWRITE_DIR, "Crawler"), os.path.join(READWRITE_DIR, "Analyzer")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import etcd3
+
+from corpus import CORPUS_END, CORPUS_START, Corpus
+from fake_etcd import FakeEtcd
+from fake_nvd import FakeNvd
+
+# Share of the corpus rewritten (with other content) to drive the analyzer's watch
+UPDATE_SHARE = 0.1
+# Seconds to wait for the analyzer's watch to catch up with the updates
+WATCH_CATCH_UP_TIMEOUT = 120
+# Seconds between RSS samples
+RSS_INTERVAL = 0.005
+AUTH = ("admin", "UIT111!!!")
+
+
+# --- Measurement ---
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # No procfs: peak RSS of the whole process so far (KiB on Linux, bytes on macOS)
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """Background thread keeping the peak RSS seen since the last reset()."""
+
+    def __init__(self, interval=RSS_INTERVAL):
+        self.interval = interval
+        self.peak = rss_bytes()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        current = rss_bytes()
+        with self.lock:
+            self.peak = max(self.peak, current)
+        return current
+
+    def reset(self):
+        with self.lock:
+            self.peak = rss_bytes()
+            return self.peak
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of `values`, None when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+class Phase:
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.latencies = []
+        self.errors = 0
+        # Seconds throughput is computed over; the whole phase when None
+        self.seconds = None
+        self.extra = {}
+
+    @contextmanager
+    def op(self, items=1):
+        """Time one operation handling `items` units of work."""
+        started = time.perf_counter()
+        yield
+        self.latencies.append(time.perf_counter() - started)
+        self.items += items
+
+
+class Bench:
+    def __init__(self):
+        self.sampler = RssSampler()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name, unit):
+        phase = Phase(name, unit)
+        rss_before = self.sampler.reset()
+        started = time.perf_counter()
+        yield phase
+        elapsed = time.perf_counter() - started
+        seconds = elapsed if phase.seconds is None else phase.seconds
+        self.sampler.sample()
+        p50, p99 = percentile(phase.latencies, 50), percentile(phase.latencies, 99)
+        self.phases[name] = {
+            "unit": phase.unit,
+            "items": phase.items,
+            "ops": len(phase.latencies),
+            "errors": phase.errors,
+            "seconds": round(elapsed, 4),
+            "throughput": round(phase.items / seconds, 2) if seconds > 0 else None,
+            "p50_ms": None if p50 is None else round(p50 * 1000, 3),
+            "p99_ms": None if p99 is None else round(p99 * 1000, 3),
+            "rss_before_mb": round(rss_before / 2 ** 20, 1),
+            "peak_rss_mb": round(self.sampler.peak / 2 ** 20, 1),
+            **phase.extra,
+        }
+        print(f"[BENCH] {name}: {phase.items} {unit} in {seconds:.2f}s, "
+              f"p50 {self.phases[name]['p50_ms']} ms, p99 {self.phases[name]['p99_ms']} ms, "
+              f"peak RSS {self.phases[name]['peak_rss_mb']} MiB", file=sys.stderr)
+
+
+# --- etcd Backend ---
+def install_etcd(args):
+    """
+    Route every etcd3.client() call (EtcdPool members of the crawler and the
+    analyzer) to the benchmark's etcd: one shared FakeEtcd, or plain-text
+    clients of the local node given with --etcd.
+    """
+    if args.etcd is None:
+        fake = FakeEtcd()
+        etcd3.client = lambda *a, **kwargs: fake
+        return "127.0.0.1:2379"
+
+    connect = etcd3.client
+    host, port = args.etcd.rsplit(":", 1)
+    etcd3.client = lambda *a, timeout=None, grpc_options=None, **kwargs: connect(
+        host=host, port=int(port), timeout=timeout, grpc_options=grpc_options)
+    client = etcd3.client()
+    if client.get_prefix_response("/vulns/", count_only=True).count:
+        if not args.reset:
+            raise SystemExit(f"etcd at {args.etcd} already has keys under /vulns/; pass --reset to delete them")
+        client.delete_prefix("/vulns/")
+    return args.etcd
+
+
+# --- Crawler Phases ---
+def bench_parse(bench, corpus, build_cve_record):
+    page_size = 2000
+    with bench.phase("crawler.parse", "entries") as phase:
+        for lo in range(0, corpus.size, page_size):
+            page = list(corpus.entries(lo, min(lo + page_size, corpus.size)))
+            with phase.op(len(page)):
+                for entry in page:
+                    build_cve_record(entry)
+        # Generating the corpus is not part of the crawler's work
+        phase.seconds = sum(phase.latencies)
+        phase.extra["note"] = "latency per 2000-entry page; throughput excludes corpus generation"
+
+
+def bench_ingest(bench, name, etcd, crawler):
+    """Fetch the whole corpus from the NVD stand-in and store it, page by page."""
+    with bench.phase(name, "cves") as phase:
+        started = time.perf_counter()
+        existing = crawler.load_existing_digests(etcd)
+        phase.extra["digests_seconds"] = round(time.perf_counter() - started, 4)
+        totals = [0, 0, 0]
+        for page in crawler.iter_cve_pages(CORPUS_START, CORPUS_END):
+            with phase.op(len(page)):
+                counts = crawler.store_cve_records_to_etcd(etcd, page, existing)
+            for i, count in enumerate(counts):
+                totals[i] += count
+        phase.errors = totals[2]
+        phase.extra.update(updated=totals[0], skipped=totals[1],
+                           note="latency per page stored; throughput includes fetching")
+    return totals
+
+
+# --- Analyzer Phases ---
+def bench_load(bench, dataset):
+    with bench.phase("analyzer.load", "cves") as phase:
+        with phase.op(0):
+            dataset.load()
+        phase.items = len(dataset.store)
+
+
+def bench_watch(bench, etcd, dataset, corpus, crawler):
+    """
+    Rewrite UPDATE_SHARE of the corpus with other content and time how the
+    analyzer's watch applies the resulting events.
+    """
+    applied = []
+    apply_events = dataset.apply_events
+
+    def timed_apply(events):
+        started = time.perf_counter()
+        apply_events(events)
+        applied.append((time.perf_counter() - started, len(events)))
+
+    dataset.apply_events = timed_apply
+    dataset._watch()
+    changed = Corpus(corpus.size, corpus.seed + 1)
+    step = max(1, round(1 / UPDATE_SHARE))
+    records = [r for r in (crawler.build_cve_record(changed.entry(i)) for i in range(0, corpus.size, step)) if r]
+
+    with bench.phase("analyzer.watch", "events") as phase:
+        started = time.perf_counter()
+        updated, _, failed = crawler.store_cve_records_to_etcd(etcd, records, crawler.load_existing_digests(etcd))
+        target = etcd.get_prefix_response(dataset.prefix, count_only=True).header.revision
+        while updated and dataset.revision < target and time.perf_counter() - started < WATCH_CATCH_UP_TIMEOUT:
+            time.sleep(0.01)
+        phase.latencies = [seconds for seconds, _ in applied]
+        phase.items = sum(count for _, count in applied)
+        phase.seconds = sum(phase.latencies)
+        phase.errors = failed + int(bool(updated) and dataset.revision < target)
+        phase.extra.update(
+            updated=updated, catch_up_seconds=round(time.perf_counter() - started, 4),
+            note="latency per apply_events call; throughput over time spent applying; "
+                 "catch_up_seconds also covers the etcd writes")
+    dataset._cancel_watch()
+    dataset.apply_events = apply_events
+
+
+def endpoints(corpus):
+    middle = corpus.published(corpus.size // 2).date()
+    year_start, year_end = f"{middle.year}-01-01", f"{middle.year}-12-31"
+    week_start, week_end = (middle - timedelta(days=7)).isoformat(), middle.isoformat()
+    return [
+        ("index", "/"),
+        ("dashboard", "/api/dashboard"),
+        ("severity_recent", f"/chart/severity_recent?from_date={week_start}&to_date={week_end}"),
+        ("severity_distribution", f"/chart/severity_distribution?from_date={year_start}&to_date={year_end}"),
+        ("cve_trend", "/chart/cve_trend"),
+        ("latest_cves", f"/chart/latest_cves?date={middle.isoformat()}&limit=50"),
+        ("cves_page", f"/api/cves?from_date={year_start}&to_date={year_end}&limit=100"),
+        ("search_host", "/api/search?q=github.com"),
+        ("search_id", f"/api/search?q=CVE-{middle.year}-1"),
+        ("search_url", "/api/search?q=advisory/12"),
+        ("export_csv", f"/export/cves?from_date={year_start}&to_date={year_end}&format=csv"),
+        ("export_parquet", f"/export/cves?from_date={year_start}&to_date={year_end}&format=parquet"),
+    ]
+
+
+def bench_endpoints(bench, visualize, corpus, requests_per_endpoint):
+    """
+    Cold requests run with the response and figure caches emptied first;
+    warm requests are answered from them (exports are never cached).
+    """
+    from fastapi.testclient import TestClient
+
+    client = TestClient(visualize.app)
+    for name, url in endpoints(corpus):
+        if name == "export_parquet" and not visualize.pyarrow_available():
+            continue
+        for temperature in ("cold", "warm"):
+            with bench.phase(f"analyzer.{name}.{temperature}", "requests") as phase:
+                sizes = []
+                if temperature == "warm":
+                    client.get(url, auth=AUTH)
+                for _ in range(requests_per_endpoint):
+                    if temperature == "cold":
+                        visualize.response_cache.clear()
+                        visualize.fragment_cache.clear()
+                    with phase.op():
+                        response = client.get(url, auth=AUTH)
+                    if response.status_code != 200:
+                        phase.errors += 1
+                    sizes.append(len(response.content))
+                phase.extra.update(url=url, response_bytes=max(sizes))
+
+
+# --- Single Run ---
+def run_size(args):
+    """Every phase for one corpus size, in this process."""
+    with FakeNvd(args.size, args.seed) as nvd:
+        # The crawler reads NVD_API_URL and the analyzer ETCD_ENDPOINTS at import time
+        os.environ["NVD_API_URL"] = nvd.url
+        os.environ["ETCD_ENDPOINTS"] = install_etcd(args)
+
+        import crawler.nvd
+        import crawler.parse
+        import crawler.ratelimit
+        import crawler.store
+        from cvestore import EtcdPool, parse_endpoints
+
+        class Crawler:
+            build_cve_record = staticmethod(crawler.parse.build_cve_record)
+            iter_cve_pages = staticmethod(crawler.nvd.iter_cve_pages)
+            load_existing_digests = staticmethod(crawler.store.load_existing_digests)
+            store_cve_records_to_etcd = staticmethod(crawler.store.store_cve_records_to_etcd)
+
+        # No NVD rate limit against the stand-in
+        crawler.ratelimit.configure_scheduler(limit=1e9)
+        etcd = EtcdPool(parse_endpoints(os.environ["ETCD_ENDPOINTS"]))
+        corpus = Corpus(args.size, args.seed)
+        bench = Bench()
+
+        bench_parse(bench, corpus, Crawler.build_cve_record)
+        bench_ingest(bench, "crawler.ingest", etcd, Crawler)
+        bench_ingest(bench, "crawler.resync", etcd, Crawler)
+
+        import visualize
+        bench_load(bench, visualize.dataset)
+        bench_endpoints(bench, visualize, corpus, args.requests)
+        bench_watch(bench, visualize.etcd, visualize.dataset, corpus, Crawler)
+        bench.sampler.stop()
+    return {"size": args.size, "cves": len(visualize.dataset.store), "phases": bench.phases}
+
+
+# --- Results ---
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(base, current):
+    """Print throughput and latency changes of `current` against `base`."""
+    base_phases = {(run["size"], name): phase for run in base["runs"] for name, phase in run["phases"].items()}
+    print(f"{'size':>7} {'phase':<40} {'throughput':>12} {'p50':>9} {'p99':>9} {'peak RSS':>9}")
+
+    def change(old, new):
+        if not old or new is None:
+            return "-"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    for run in current["runs"]:
+        for name, phase in run["phases"].items():
+            old = base_phases.get((run["size"], name))
+            if old is None:
+                continue
+            print(f"{run['size']:>7} {name:<40} {change(old['throughput'], phase['throughput']):>12} "
+                  f"{change(old['p50_ms'], phase['p50_ms']):>9} {change(old['p99_ms'], phase['p99_ms']):>9} "
+                  f"{change(old['peak_rss_mb'], phase['peak_rss_mb']):>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the crawler and analyzer on a synthetic CVE corpus.")
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="comma-separated corpus sizes, 1000 to 500000 (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1, help="corpus seed (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=20,
+                        help="requests per endpoint, cold and warm each (default: %(default)s)")
+    parser.add_argument("--etcd", metavar="HOST:PORT",
+                        help="local single-node etcd to use instead of the in-process fake")
+    parser.add_argument("--reset", action="store_true", help="delete /vulns/ on --etcd before each size")
+    parser.add_argument("--output", help="results file (default: results/<timestamp>.json)")
+    parser.add_argument("--compare", metavar="BASE", help="print changes against an earlier results file")
+    parser.add_argument("--log-level", default="WARNING", help="logging level (default: %(default)s)")
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()),
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+
+    if args.size is not None:
+        # Child process: one size, results on stdout
+        json.dump(run_size(args), sys.stdout)
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    if any(not 1000 <= size <= 500000 for size in sizes):
+        parser.error("sizes must be between 1000 and 500000")
+    if len(sizes) > 1 and args.etcd and not args.reset:
+        parser.error("several sizes against --etcd need --reset")
+
+    results = {
+        "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "requests": args.requests,
+        "etcd": args.etcd or "fake",
+        "runs": [],
+    }
+    child_args = list(argv if argv is not None else sys.argv[1:])
+    for size in sizes:
+        # A fresh process per size, so peak RSS and warm state do not carry over
+        print(f"[BENCH] Size {size}...", file=sys.stderr)
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), *child_args, "--size", str(size)],
+                               stdout=subprocess.PIPE)
+        if child.returncode != 0:
+            raise SystemExit(f"[BENCH] Size {size} failed with exit status {child.returncode}")
+        results["runs"].append(json.loads(child.stdout))
+
+    path = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"[BENCH] Results written to {path}", file=sys.stderr)
+
+    for run in results["runs"]:
+        for name, phase in run["phases"].items():
+            print(f"{run['size']:>7} {name:<40} {phase['throughput'] or 0:>12.1f} {phase['unit']}/s "
+                  f"p50 {phase['p50_ms']} ms  p99 {phase['p99_ms']} ms  peak {phase['peak_rss_mb']} MiB"
+                  + (f"  errors {phase['errors']}" if phase["errors"] else ""))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+# --- Synthetic NVD Corpus ---
+# Entries look like NVD CVE API 2.0 items: a status mix the crawler filters,
+# CVSS v3.1/v3.0/v4.0 metrics (or none), descriptions, weaknesses and
+# references spread over common NVD hosts and vendor sites. Publication dates
+# are spread evenly over [CORPUS_START, CORPUS_END) in index order, so the
+# entries of a date window are a contiguous index range.
+CORPUS_START = datetime(2015, 1, 1, tzinfo=timezone.utc)
+CORPUS_END = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+STATUSES = [("Analyzed", 0.85), ("Modified", 0.07), ("Awaiting Analysis", 0.05), ("Rejected", 0.03)]
+METRIC_VERSIONS = [("cvssMetricV31", 0.7), ("cvssMetricV30", 0.1), ("cvssMetricV40", 0.1), (None, 0.1)]
+
+REFERENCE_HOSTS = [
+    "github.com", "nvd.nist.gov", "security.netapp.com", "lists.fedoraproject.org",
+    "www.openwall.com", "lists.debian.org", "www.debian.org", "security.gentoo.org",
+    "access.redhat.com", "bugzilla.redhat.com", "www.oracle.com", "support.apple.com",
+    "msrc.microsoft.com", "www.wordfence.com", "wpscan.com", "vuldb.com", "huntr.com",
+]
+VENDOR_HOSTS = [f"www.vendor{n}.com" for n in range(200)]
+PATH_WORDS = ["security", "advisory", "advisories", "bulletin", "commit", "issues", "pull",
+              "releases", "blob", "main", "CVE", "patch", "bugs", "show_bug.cgi", "kb"]
+WORDS = ["buffer", "overflow", "remote", "attacker", "crafted", "request", "allows", "execute",
+         "arbitrary", "code", "denial", "service", "authentication", "bypass", "injection",
+         "cross-site", "scripting", "privilege", "escalation", "memory", "corruption", "via"]
+CWES = ["CWE-79", "CWE-89", "CWE-787", "CWE-20", "CWE-125", "CWE-78", "CWE-416", "CWE-22", "CWE-352"]
+
+
+def _pick(rng, weighted):
+    value = rng.random()
+    for item, weight in weighted:
+        value -= weight
+        if value < 0:
+            return item
+    return weighted[-1][0]
+
+
+def severity_of(score):
+    if score == 0:
+        return "NONE"
+    if score < 4:
+        return "LOW"
+    if score < 7:
+        return "MEDIUM"
+    if score < 9:
+        return "HIGH"
+    return "CRITICAL"
+
+
+def format_nvd_timestamp(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}"
+
+
+class Corpus:
+    """
+    `size` NVD-shaped CVE entries. Entry i depends only on (seed, i), so any
+    part of the corpus can be generated on its own and every run sees the
+    same data.
+    """
+
+    def __init__(self, size, seed=1, start=CORPUS_START, end=CORPUS_END):
+        self.size = size
+        self.seed = seed
+        self.start = start
+        self.end = end
+        self.step = (end - start) / size
+
+    def published(self, i):
+        return self.start + self.step * i
+
+    def index_range(self, start, end):
+        """Indexes [lo, hi) of the entries published in [start, end)."""
+        lo = math.ceil((start - self.start) / self.step)
+        hi = math.ceil((end - self.start) / self.step)
+        return max(0, min(lo, self.size)), max(0, min(hi, self.size))
+
+    def entry(self, i):
+        rng = random.Random(self.seed * 1_000_003 + i)
+        published = self.published(i)
+        modified = min(published + timedelta(days=rng.expovariate(1 / 60)), self.end)
+        cve_id = f"CVE-{published.year}-{10000 + i}"
+
+        metrics = {}
+        version = _pick(rng, METRIC_VERSIONS)
+        if version is not None:
+            score = round(rng.uniform(1.0, 10.0), 1)
+            metrics[version] = [{
+                "source": "nvd@nist.gov",
+                "type": "Primary",
+                "cvssData": {
+                    "version": {"cvssMetricV31": "3.1", "cvssMetricV30": "3.0", "cvssMetricV40": "4.0"}[version],
+                    "vectorString": "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H",
+                    "baseScore": score,
+                    "baseSeverity": severity_of(score),
+                },
+                "exploitabilityScore": round(rng.uniform(0.1, 3.9), 1),
+                "impactScore": round(rng.uniform(0.1, 6.0), 1),
+            }]
+
+        references = []
+        for _ in range(rng.randint(1, 8)):
+            host = rng.choice(REFERENCE_HOSTS) if rng.random() < 0.8 else rng.choice(VENDOR_HOSTS)
+            path = "/".join(rng.choice(PATH_WORDS) for _ in range(rng.randint(1, 3)))
+            references.append({"url": f"https://{host}/{path}/{rng.randrange(10 ** 6)}", "source": "nvd@nist.gov"})
+
+        return {
+            "cve": {
+                "id": cve_id,
+                "sourceIdentifier": "cve@mitre.org",
+                "published": format_nvd_timestamp(published),
+                "lastModified": format_nvd_timestamp(modified),
+                "vulnStatus": _pick(rng, STATUSES),
+                "descriptions": [{"lang": "en", "value": " ".join(rng.choice(WORDS) for _ in range(rng.randint(12, 40)))}],
+                "metrics": metrics,
+                "weaknesses": [{"source": "nvd@nist.gov", "type": "Primary",
+                                "description": [{"lang": "en", "value": rng.choice(CWES)}]}],
+                "references": references,
+            }
+        }
+
+    def entries(self, lo=0, hi=None):
+        for i in range(lo, self.size if hi is None else hi):
+            yield self.entry(i)
@@ -0,0 +1,211 @@
+import itertools
+import threading
+from bisect import bisect_left
+
+from etcd3 import transactions
+from etcd3.client import KVMetadata
+from etcd3.events import DeleteEvent, PutEvent
+
+
+# --- In-process etcd Stand-in ---
+class KeyValue:
+    __slots__ = ("key", "value", "create_revision", "mod_revision", "version", "lease")
+
+    def __init__(self, key, value, create_revision, mod_revision, version):
+        self.key = key
+        self.value = value
+        self.create_revision = create_revision
+        self.mod_revision = mod_revision
+        self.version = version
+        self.lease = 0
+
+
+class Header:
+    def __init__(self, revision):
+        self.revision = revision
+
+
+class RangeResponse:
+    def __init__(self, kvs, revision, count=None):
+        self.kvs = kvs
+        self.count = len(kvs) if count is None else count
+        self.header = Header(revision)
+
+
+class DeleteRangeResponse:
+    def __init__(self, deleted, revision):
+        self.deleted = deleted
+        self.header = Header(revision)
+
+
+class WatchEvent:
+    def __init__(self, kv, prev_kv=None):
+        self.kv = kv
+        self.prev_kv = prev_kv
+
+
+class WatchResponse:
+    def __init__(self, events, revision):
+        self.events = events
+        self.header = Header(revision)
+
+
+class Status:
+    leader = None
+
+
+def _bytes(value):
+    return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+
+def _prefix_end(prefix):
+    # Same range end etcd uses for a prefix: the prefix with its last byte incremented
+    end = bytearray(prefix)
+    while end and end[-1] == 0xFF:
+        end.pop()
+    if not end:
+        return None
+    end[-1] += 1
+    return bytes(end)
+
+
+class FakeEtcd:
+    """
+    Single-member etcd in memory with the etcd3 client calls EtcdPool, the
+    crawler and the dataset make: reads, puts, deletes, transactions,
+    revisions and prefix watches. Watch callbacks run on the writing thread
+    right after each write, like a watch that never lags.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.revision = 1
+        self.lock = threading.RLock()
+        self._sorted = None
+        self._watches = {}
+        self._watch_ids = itertools.count(1)
+        self.transactions = transactions
+
+    # --- Reads ---
+    def status(self):
+        return Status()
+
+    def _range(self, start, end, keys_only=False, count_only=False):
+        with self.lock:
+            if self._sorted is None:
+                self._sorted = sorted(self.data)
+            keys = self._sorted
+            lo = bisect_left(keys, start)
+            hi = len(keys) if end is None else bisect_left(keys, end)
+            if count_only:
+                return RangeResponse([], self.revision, count=hi - lo)
+            kvs = [self.data[k] for k in keys[lo:hi]]
+            revision = self.revision
+        if keys_only:
+            kvs = [KeyValue(kv.key, b"", kv.create_revision, kv.mod_revision, kv.version) for kv in kvs]
+        return RangeResponse(kvs, revision)
+
+    def get(self, key, **kwargs):
+        with self.lock:
+            kv = self.data.get(_bytes(key))
+            revision = self.revision
+        if kv is None:
+            return None, None
+        return kv.value, KVMetadata(kv, Header(revision))
+
+    def get_prefix_response(self, key_prefix, keys_only=False, count_only=False, **kwargs):
+        prefix = _bytes(key_prefix)
+        return self._range(prefix, _prefix_end(prefix), keys_only, count_only)
+
+    def get_prefix(self, key_prefix, **kwargs):
+        response = self.get_prefix_response(key_prefix, **kwargs)
+        return ((kv.value, KVMetadata(kv, response.header)) for kv in response.kvs)
+
+    def get_range_response(self, range_start, range_end, keys_only=False, count_only=False, **kwargs):
+        return self._range(_bytes(range_start), _bytes(range_end), keys_only, count_only)
+
+    # --- Writes ---
+    def _put(self, key, value, revision, events):
+        key = _bytes(key)
+        old = self.data.get(key)
+        if old is None:
+            self._sorted = None
+            kv = KeyValue(key, _bytes(value), revision, revision, 1)
+        else:
+            kv = KeyValue(key, _bytes(value), old.create_revision, revision, old.version + 1)
+        self.data[key] = kv
+        events.append(PutEvent(WatchEvent(kv, old)))
+
+    def _delete(self, key, revision, events):
+        old = self.data.pop(_bytes(key), None)
+        if old is None:
+            return False
+        self._sorted = None
+        events.append(DeleteEvent(WatchEvent(KeyValue(old.key, b"", 0, revision, 0), old)))
+        return True
+
+    def _commit(self, write):
+        with self.lock:
+            revision = self.revision + 1
+            events = []
+            result = write(revision, events)
+            if events:
+                self.revision = revision
+            watches = list(self._watches.values())
+        for prefix, callback in watches:
+            matching = [e for e in events if e.key.startswith(prefix)]
+            if matching:
+                callback(WatchResponse(matching, revision))
+        return result
+
+    def put(self, key, value, **kwargs):
+        return self._commit(lambda revision, events: self._put(key, value, revision, events))
+
+    def delete(self, key, **kwargs):
+        return self._commit(lambda revision, events: self._delete(key, revision, events))
+
+    def delete_prefix(self, prefix):
+        prefix = _bytes(prefix)
+
+        def write(revision, events):
+            keys = [key for key in self.data if key.startswith(prefix)]
+            return DeleteRangeResponse(sum(self._delete(key, revision, events) for key in keys), revision)
+
+        return self._commit(write)
+
+    def transaction(self, compare, success=None, failure=None):
+        if compare:
+            raise NotImplementedError("FakeEtcd transactions take no compare clauses")
+
+        def write(revision, events):
+            responses = []
+            for op in success or []:
+                if isinstance(op, transactions.Put):
+                    self._put(op.key, op.value, revision, events)
+                    responses.append(None)
+                elif isinstance(op, transactions.Delete):
+                    self._delete(op.key, revision, events)
+                    responses.append(None)
+                elif isinstance(op, transactions.Get):
+                    kv = self.data.get(_bytes(op.key))
+                    responses.append([] if kv is None else [(kv.value, KVMetadata(kv, Header(revision)))])
+                else:
+                    raise NotImplementedError(f"unsupported transaction op {op!r}")
+            return True, responses
+
+        return self._commit(write)
+
+    # --- Watches ---
+    def add_watch_prefix_callback(self, key_prefix, callback, start_revision=None, **kwargs):
+        # History is not kept: a watch sees writes made after it was added
+        watch_id = next(self._watch_ids)
+        with self.lock:
+            self._watches[watch_id] = (_bytes(key_prefix), callback)
+        return watch_id
+
+    def cancel_watch(self, watch_id):
+        with self.lock:
+            self._watches.pop(watch_id, None)
+
+    def close(self):
+        pass
@@ -0,0 +1,92 @@
+import json
+import multiprocessing
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from corpus import Corpus
+
+API_PATH = "/rest/json/cves/2.0"
+
+
+# --- Local NVD Stand-in ---
+def _parse_date(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def _handler(corpus, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path != API_PATH or "pubStartDate" not in params:
+                # Only the published-date paging the crawler's sync uses is served
+                self.send_error(400, "only pubStartDate/pubEndDate queries are supported")
+                return
+            lo, hi = corpus.index_range(_parse_date(params["pubStartDate"]), _parse_date(params["pubEndDate"]))
+            start = lo + int(params.get("startIndex", 0))
+            per_page = int(params.get("resultsPerPage", 2000))
+            body = json.dumps({
+                "resultsPerPage": per_page,
+                "startIndex": start - lo,
+                "totalResults": hi - lo,
+                "format": "NVD_CVE",
+                "version": "2.0",
+                "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000"),
+                "vulnerabilities": list(corpus.entries(min(start, hi), min(start + per_page, hi))),
+            }).encode("utf-8")
+            if latency:
+                time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _serve(size, seed, latency, ready):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(Corpus(size, seed), latency))
+    ready.send(server.server_address[1])
+    server.serve_forever()
+
+
+class FakeNvd:
+    """
+    NVD CVE API 2.0 over a Corpus, served from a separate process so that
+    generating pages does not compete with the crawler for the GIL.
+    `latency` adds seconds to every response.
+    """
+
+    def __init__(self, size, seed=1, latency=0.0):
+        self.size = size
+        self.seed = seed
+        self.latency = latency
+        self.process = None
+        self.url = None
+
+    def start(self):
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        self.process = multiprocessing.Process(
+            target=_serve, args=(self.size, self.seed, self.latency, sender), daemon=True)
+        self.process.start()
+        self.url = f"http://127.0.0.1:{receiver.recv()}{API_PATH}"
+        return self.url
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
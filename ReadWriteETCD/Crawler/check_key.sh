@@ -1,2 +1,3 @@
+# CVE values are stored in the binary codec format; decode them to JSON for reading
 echo "etcdctl get /vulns/cve/ --prefix"
-etcdctl get /vulns/cve/ --prefix
+etcdctl get /vulns/cve/ --prefix -w json | (cd "$(dirname "$0")/.." && python3 -m cvestore decode)
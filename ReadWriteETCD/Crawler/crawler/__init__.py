@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Shared etcd storage helpers live in ReadWriteETCD/cvestore
+_READWRITE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _READWRITE_DIR not in sys.path:
+    sys.path.insert(0, _READWRITE_DIR)
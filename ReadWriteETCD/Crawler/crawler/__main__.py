@@ -0,0 +1,71 @@
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime, timezone
+
+from .config import BACKFILL_PROCESSES, FETCH_WORKERS, LOG_FORMAT, METRICS_FILE, NVD_FIRST_YEAR, log_mode
+from .pipeline import run_backfill_pipeline, run_daily_pipeline, run_incremental_pipeline, run_pipeline
+
+from cvestore import REGISTRY, gauge
+
+RUN_SECONDS = gauge("crawler_run_seconds", "Duration of the last run", ["mode"])
+RUN_SUCCESS = gauge("crawler_run_success", "1 if the last run completed, 0 if it failed", ["mode"])
+RUN_FINISHED = gauge("crawler_run_finished_timestamp_seconds", "Unix time the last run ended", ["mode"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="crawler", description="Collect CVEs from NVD into etcd.")
+    parser.add_argument("--log-level", default=log_mode, help="logging level (default: %(default)s)")
+    parser.add_argument("--metrics-file", default=METRICS_FILE,
+                        help="write Prometheus metrics to this file when the run ends")
+    modes = parser.add_subparsers(dest="mode", required=True)
+
+    modes.add_parser("daily", help="fetch CVEs published in the last 24 hours")
+    modes.add_parser("year", help="fetch CVEs published since January 1st")
+    modes.add_parser("incremental", help="fetch CVEs modified since the stored watermark")
+
+    backfill = modes.add_parser("backfill", help="load the CVE history year by year in parallel")
+    backfill.add_argument("--from", dest="from_year", type=int, default=NVD_FIRST_YEAR)
+    backfill.add_argument("--to", dest="to_year", type=int, default=datetime.now(timezone.utc).year)
+    backfill.add_argument("--processes", type=int, default=BACKFILL_PROCESSES,
+                          help="worker processes (default: %(default)s)")
+    backfill.add_argument("--workers", type=int, default=FETCH_WORKERS,
+                          help="page fetchers per process (default: %(default)s)")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper()), format=LOG_FORMAT)
+
+    started = time.perf_counter()
+    code = 1
+    try:
+        code = run_mode(parser, args)
+    finally:
+        RUN_SECONDS.set(time.perf_counter() - started, mode=args.mode)
+        RUN_SUCCESS.set(int(code == 0), mode=args.mode)
+        RUN_FINISHED.set(time.time(), mode=args.mode)
+        if args.metrics_file:
+            REGISTRY.write_textfile(args.metrics_file)
+            logging.info(f"[METRICS] Written to {args.metrics_file}")
+    return code
+
+
+def run_mode(parser, args):
+    if args.mode == "daily":
+        run_daily_pipeline()
+    elif args.mode == "year":
+        run_pipeline()
+    elif args.mode == "incremental":
+        if not run_incremental_pipeline():
+            return 1
+    elif args.mode == "backfill":
+        if args.from_year > args.to_year:
+            parser.error("--from must not be after --to")
+        incomplete = run_backfill_pipeline(args.from_year, args.to_year, args.processes, args.workers)
+        if incomplete:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import os
+
+# --- Configuration for etcd and NVD API ---
+# Every setting can be overridden from the environment
+# Members of the 3-node cluster from BuildETCD/etcd.sh
+ETCD_ENDPOINTS = os.environ.get('ETCD_ENDPOINTS', '10.0.0.11:2379,10.0.0.12:2379,10.0.0.13:2379')
+CA_CERT_PATH = os.environ.get('ETCD_CA_CERT', '/opt/cfssl/ca.pem')
+CERT_CERT_PATH = os.environ.get('ETCD_CERT', '/opt/cfssl/etcd.pem')
+CERT_KEY_PATH = os.environ.get('ETCD_KEY', '/opt/cfssl/etcd-key.pem')
+
+# Your NVD API key - make sure to keep this secure in production
+NVD_API_KEY = os.environ.get('NVD_API_KEY', "005e41c8-ad08-4d8d-9fb7-cb958cd058f3")
+
+# Key prefix used in etcd to organize CVE data
+ETCD_KEY_PREFIX = '/vulns/cve/'
+
+# NVD paging limits: a date range may not exceed 120 consecutive days,
+# and a single page returns at most 2000 results
+NVD_API_URL = os.environ.get('NVD_API_URL', "https://services.nvd.nist.gov/rest/json/cves/2.0")
+NVD_MAX_RANGE_DAYS = 120
+NVD_RESULTS_PER_PAGE = 2000
+
+# NVD rate limits: requests per rolling window, with and without an API key
+NVD_RATE_WINDOW = 30
+NVD_REQUESTS_PER_WINDOW = 5
+NVD_REQUESTS_PER_WINDOW_WITH_KEY = 50
+
+# Retries for throttled or failed NVD requests, with jittered exponential
+# back-off between NVD_BACKOFF_BASE and NVD_BACKOFF_MAX seconds
+NVD_MAX_RETRIES = 6
+NVD_BACKOFF_BASE = 2.0
+NVD_BACKOFF_MAX = 120.0
+
+# Number of page requests allowed in flight at the same time
+FETCH_WORKERS = 4
+
+# Number of worker processes used by the backfill mode
+BACKFILL_PROCESSES = 4
+
+# First year with CVEs in NVD
+NVD_FIRST_YEAR = 2002
+
+# Transaction limits: etcd rejects requests above --max-request-bytes
+# (1.5 MiB by default) and transactions above --max-txn-ops (128 by default)
+ETCD_MAX_TXN_OPS = 128
+ETCD_MAX_TXN_BYTES = 1024 * 1024
+
+# Largest etcd response accepted, in bytes. The digests are loaded with one
+# ranged read of about 100 bytes per CVE, over gRPC's 4 MiB default by 40k CVEs
+ETCD_MAX_RECEIVE_BYTES = int(os.environ.get('ETCD_MAX_RECEIVE_BYTES', 256 * 1024 * 1024))
+
+# Companion keys holding a digest of each CVE value, mirroring the CVE
+# key layout: /vulns/digest/analyzed/<cveId>
+ETCD_DIGEST_PREFIX = '/vulns/digest/'
+
+# Durable incremental-sync watermark: the lastModified end of the last
+# fully committed run, kept outside the CVE prefix the analyzer scans
+ETCD_WATERMARK_KEY = '/vulns/meta/watermark/lastModified'
+
+# Secondary index keys written by earlier crawler versions. Nothing reads
+# them any more; every run deletes whatever is left under this prefix
+ETCD_RETIRED_INDEX_PREFIX = '/vulns/idx/'
+
+# Only these NVD statuses are persisted
+ALLOWED_STATUS = ["Analyzed"]
+
+# Prometheus text file written at the end of every run, for the
+# node_exporter textfile collector; empty disables it
+METRICS_FILE = os.environ.get('CRAWLER_METRICS_FILE', '')
+
+# --- Logging Setup ---
+# Configure log output format and level
+log_mode = os.environ.get('LOG_LEVEL', 'DEBUG')
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
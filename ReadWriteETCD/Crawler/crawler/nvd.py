@@ -0,0 +1,167 @@
+import ijson
+import logging
+import requests
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+
+from .config import NVD_API_KEY, NVD_API_URL, NVD_MAX_RANGE_DAYS, NVD_RESULTS_PER_PAGE, FETCH_WORKERS
+from .parse import build_cve_record
+from .ratelimit import get_scheduler
+
+from cvestore import counter, histogram
+
+# Seconds per page in each stage: fetch (download and JSON parsing), parse
+# (building records) and store (etcd transactions, timed by the pipeline)
+STAGE_SECONDS = histogram("crawler_stage_seconds", "Seconds spent on one page, by stage", ["stage"])
+NVD_ENTRIES = counter("crawler_nvd_entries_total", "NVD entries read, by result", ["result"])
+
+
+# --- Fetch CVEs from NVD ---
+def format_nvd_date(value: datetime):
+    """
+    Format a datetime the way the NVD API expects it.
+    """
+    return value.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def split_date_range(start_date: datetime, end_date: datetime, max_days=NVD_MAX_RANGE_DAYS):
+    """
+    Split [start_date, end_date] into consecutive windows NVD accepts.
+    """
+    windows = []
+    cursor = start_date
+    while cursor < end_date:
+        window_end = min(cursor + timedelta(days=max_days), end_date)
+        windows.append((cursor, window_end))
+        cursor = window_end
+    return windows
+
+
+def iter_vulnerabilities(stream):
+    """
+    Incrementally parse an NVD response body.
+
+    Yields ("totalResults", int) once and ("item", dict) for every entry of
+    `vulnerabilities`, so only one raw entry is materialized at a time.
+    """
+    builder = None
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == "vulnerabilities.item" and event == "end_map":
+                yield "item", builder.value
+                builder = None
+        elif prefix == "vulnerabilities.item" and event == "start_map":
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+        elif prefix == "totalResults":
+            yield "totalResults", int(value)
+
+
+def fetch_cve_page(start_date: datetime, end_date: datetime, start_index=0, date_field="pub"):
+    """
+    Fetch one page of CVEs between `start_date` and `end_date`.
+    `date_field` is "pub" (published) or "lastMod" (last modified).
+
+    The request runs through the rate-limit scheduler, which retries
+    throttling and transient errors. The body is parsed as it streams in
+    and every entry is reduced to its etcd record straight away, so raw
+    entries never pile up in memory.
+    Returns (totalResults, [(key, value, digest), ...]).
+    """
+    params = {
+        f"{date_field}StartDate": format_nvd_date(start_date),
+        f"{date_field}EndDate": format_nvd_date(end_date),
+        "startIndex": start_index,
+        "resultsPerPage": NVD_RESULTS_PER_PAGE
+    }
+    headers = {"apiKey": NVD_API_KEY}
+
+    def request():
+        total = 0
+        records = []
+        errors = filtered = 0
+        started = time.perf_counter()
+        parsing = 0.0
+        with requests.get(NVD_API_URL, headers=headers, params=params, timeout=60, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            for kind, value in iter_vulnerabilities(response.raw):
+                if kind == "totalResults":
+                    total = value
+                    continue
+                parse_started = time.perf_counter()
+                try:
+                    record = build_cve_record(value)
+                except Exception as e:
+                    logging.error(f"[PARSE] Error parsing CVE: {e}")
+                    errors += 1
+                    continue
+                finally:
+                    parsing += time.perf_counter() - parse_started
+                if record is not None:
+                    records.append(record)
+                else:
+                    filtered += 1
+        # Download and record building interleave; only a completed attempt is counted
+        STAGE_SECONDS.observe(time.perf_counter() - started - parsing, stage="fetch")
+        STAGE_SECONDS.observe(parsing, stage="parse")
+        NVD_ENTRIES.inc(len(records), result="storable")
+        NVD_ENTRIES.inc(filtered, result="filtered")
+        NVD_ENTRIES.inc(errors, result="error")
+        return total, records
+
+    return get_scheduler().run(request)
+
+
+def iter_cve_pages(start_date: datetime, end_date: datetime, workers=FETCH_WORKERS, date_field="pub"):
+    """
+    Yield pages of CVE records between `start_date` and `end_date`.
+
+    The range is split into NVD-sized windows. The first page of every window
+    tells us `totalResults`, and the remaining pages are queued on the same
+    pool. At most `workers` pages are in flight or waiting to be consumed,
+    which keeps memory bounded however large the range is. Pages are yielded
+    in completion order, not in date order.
+    Failed pages are logged and skipped, and a RuntimeError is raised once
+    the other pages have been yielded so callers know the range is incomplete.
+    """
+    windows = split_date_range(start_date, end_date)
+    logging.info(f"[FETCH] Fetching CVEs from NVD between {format_nvd_date(start_date)} "
+                 f"and {format_nvd_date(end_date)} in {len(windows)} window(s)")
+
+    fetched = 0
+    failed_pages = 0
+    queued = deque((window_start, window_end, 0) for window_start, window_end in windows)
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while queued or pending:
+            while queued and len(pending) < workers:
+                task = queued.popleft()
+                pending[pool.submit(fetch_cve_page, *task, date_field)] = task
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                window_start, window_end, start_index = pending.pop(future)
+                try:
+                    total, records = future.result()
+                except Exception as e:
+                    logging.error(f"[FETCH] Failed to fetch page {start_index} of "
+                                  f"{format_nvd_date(window_start)}..{format_nvd_date(window_end)}: {e}")
+                    failed_pages += 1
+                    continue
+
+                if start_index == 0:
+                    for next_index in range(NVD_RESULTS_PER_PAGE, total, NVD_RESULTS_PER_PAGE):
+                        queued.append((window_start, window_end, next_index))
+
+                fetched += len(records)
+                logging.debug(f"[FETCH] Page {start_index} of {format_nvd_date(window_start)}: {len(records)} records")
+                yield records
+
+    logging.info(f"[FETCH] Retrieved {fetched} storable CVEs.")
+    get_scheduler().log_stats()
+    if failed_pages:
+        raise RuntimeError(f"{failed_pages} NVD page(s) could not be fetched")
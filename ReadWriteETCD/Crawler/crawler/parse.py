@@ -0,0 +1,83 @@
+import hashlib
+import json
+import logging
+
+from cvestore import encode_value, CODEC_VERSION
+
+from .config import ALLOWED_STATUS, ETCD_KEY_PREFIX
+
+
+# --- Parse CVE Entry ---
+def extract_cve_summary_from_raw(cve_entry):
+    """
+    Extract core CVE metadata from a raw NVD entry.
+    Supports metrics from CVSS v3.1, v3.0, and v4.0.
+    """
+    cve = cve_entry.get("cve", {})
+    cve_id = cve.get("id")
+    published = cve.get("published")
+    modified = cve.get("lastModified")
+    references = [r.get("url") for r in cve.get("references", []) if r.get("url")]
+
+    base_score = None
+    base_severity = None
+    metrics = cve.get("metrics", {})
+
+    # Try multiple CVSS versions in order of preference
+    for key in ["cvssMetricV31", "cvssMetricV30", "cvssMetricV40"]:
+        for m in metrics.get(key, []):
+            data = m.get("cvssData", {})
+            if data:
+                base_score = data.get("baseScore")
+                base_severity = data.get("baseSeverity")
+                break
+        if base_score is not None:
+            break
+
+    return {
+        "cveId": cve_id,
+        "datePublished": published,
+        "dateModified": modified,
+        "baseScore": base_score,
+        "baseSeverity": base_severity,
+        "references": references
+    }
+
+
+def compute_digest(data):
+    """
+    Stable digest of a CVE summary, taken over its canonical JSON form.
+    The value format version is mixed in, so a format change rewrites
+    (and thereby migrates) every record on the next full sync.
+    """
+    canonical = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    payload = f"{CODEC_VERSION}:{canonical}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def build_cve_record(cve_raw):
+    """
+    Turn a raw NVD entry into an (etcd key, etcd value, digest) tuple.
+    Returns None for entries that should not be stored.
+    """
+    cve_data = cve_raw.get("cve", {})
+    cve_id = cve_data.get("id")
+    vuln_status = cve_data.get("vulnStatus", "")
+
+    if vuln_status not in ALLOWED_STATUS:
+        logging.debug(f"[SKIP] {cve_id} status = {vuln_status}")
+        return None
+
+    normalized_status = vuln_status.lower().replace(" ", "-")
+    data = extract_cve_summary_from_raw(cve_raw)
+
+    if not data or not data.get("cveId") or data.get("baseScore") is None or \
+       data.get("baseSeverity") is None or data.get("references") is None:
+        return None
+
+    if not cve_id.startswith("CVE-"):
+        logging.debug(f"[SKIP] Unsupported ID format: {cve_id}")
+        return None
+
+    key = f"{ETCD_KEY_PREFIX}{normalized_status}/{cve_id}"
+    return key, encode_value(data), compute_digest(data)
@@ -0,0 +1,173 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+from .config import BACKFILL_PROCESSES, FETCH_WORKERS, LOG_FORMAT, log_mode
+from .nvd import STAGE_SECONDS, format_nvd_date, iter_cve_pages
+from .ratelimit import configure_scheduler, max_share
+from .store import (
+    connect_to_etcd, drop_retired_index, load_existing_digests, store_cve_records_to_etcd,
+    read_watermark, write_watermark,
+)
+
+from cvestore import REGISTRY
+
+
+# --- Range Sync ---
+def sync_range(etcd, start_date: datetime, end_date: datetime, existing=None,
+               date_field="pub", workers=FETCH_WORKERS):
+    """
+    Fetch every CVE between `start_date` and `end_date` and store it to etcd.
+    Returns (updated, skipped, failed) totals; a fetch failure is raised as
+    RuntimeError after everything that could be fetched was stored.
+    """
+    if existing is None:
+        existing = load_existing_digests(etcd)
+
+    totals = [0, 0, 0]
+    for page in iter_cve_pages(start_date, end_date, workers=workers, date_field=date_field):
+        with STAGE_SECONDS.time(stage="store"):
+            counts = store_cve_records_to_etcd(etcd, page, existing)
+        for i, count in enumerate(counts):
+            totals[i] += count
+    return tuple(totals)
+
+
+# --- Pipelines ---
+def run_pipeline():
+    """
+    Main entry point: connect to etcd, fetch latest CVEs from NVD,
+    and persist valid entries to etcd storage.
+    """
+    etcd = connect_to_etcd()
+    drop_retired_index(etcd)
+
+    now = datetime.now(timezone.utc)
+    start_of_year = datetime(now.year, 1, 1, tzinfo=timezone.utc)
+
+    sync_range(etcd, start_of_year, now)
+
+
+def run_daily_pipeline():
+    """
+    Fetch CVEs in the last 1 day and store to etcd.
+    """
+    etcd = connect_to_etcd()
+    drop_retired_index(etcd)
+
+    now = datetime.now(timezone.utc)
+    one_day_ago = now - timedelta(days=1)
+
+    sync_range(etcd, one_day_ago, now)
+
+
+def run_incremental_pipeline():
+    """
+    Fetch only CVEs modified since the stored watermark and store them to etcd.
+    The watermark is advanced only when every page was fetched and committed,
+    so a failed run is retried from the same point next time.
+    Returns True when the run was complete and the watermark advanced.
+    """
+    etcd = connect_to_etcd()
+    drop_retired_index(etcd)
+
+    now = datetime.now(timezone.utc)
+    since = read_watermark(etcd)
+    if since is None:
+        since = datetime(now.year, 1, 1, tzinfo=timezone.utc)
+        logging.info(f"[SYNC] No watermark found, starting from {format_nvd_date(since)}")
+
+    try:
+        _, _, failed = sync_range(etcd, since, now, date_field="lastMod")
+    except RuntimeError as e:
+        logging.error(f"[SYNC] Incomplete fetch, watermark not advanced: {e}")
+        return False
+
+    if failed:
+        logging.error(f"[SYNC] {failed} CVE(s) failed to store, watermark not advanced")
+        return False
+
+    write_watermark(etcd, now)
+    return True
+
+
+# --- Backfill ---
+# Per-process state for backfill workers: gRPC channels cannot be shared
+# across fork(), so every worker opens its own client and digest map
+_worker_etcd = None
+_worker_existing = None
+
+
+def _init_backfill_worker(processes):
+    global _worker_etcd, _worker_existing
+    logging.basicConfig(level=getattr(logging, log_mode), format=LOG_FORMAT)
+    # Every process gets an equal share of the NVD rate budget
+    configure_scheduler(share=processes)
+    _worker_etcd = connect_to_etcd()
+    drop_retired_index(_worker_etcd)
+    _worker_existing = load_existing_digests(_worker_etcd)
+
+
+def _backfill_window(start_date: datetime, end_date: datetime, workers):
+    """
+    Fetch, parse and store one backfill window inside a worker process.
+    """
+    label = f"{format_nvd_date(start_date)}..{format_nvd_date(end_date)}"
+    try:
+        totals = sync_range(_worker_etcd, start_date, end_date, _worker_existing, workers=workers)
+    except RuntimeError as e:
+        logging.error(f"[BACKFILL] Window {label} incomplete: {e}")
+        totals = None
+    # Metrics live in the worker; hand them to the parent with the result
+    return label, totals, REGISTRY.drain()
+
+
+def split_backfill_windows(from_year, to_year, now=None):
+    """
+    Split the years [from_year, to_year] into one window per year,
+    capped at `now`.
+    """
+    now = now or datetime.now(timezone.utc)
+    windows = []
+    for year in range(from_year, to_year + 1):
+        start = datetime(year, 1, 1, tzinfo=timezone.utc)
+        end = min(datetime(year + 1, 1, 1, tzinfo=timezone.utc), now)
+        if start < end:
+            windows.append((start, end))
+    return windows
+
+
+def run_backfill_pipeline(from_year, to_year, processes=BACKFILL_PROCESSES, workers=FETCH_WORKERS):
+    """
+    Load the CVE history between `from_year` and `to_year` (inclusive).
+    Every year is fetched, parsed and stored by one of `processes` worker
+    processes, each running its own pool of `workers` page fetchers.
+    Returns the list of windows that could not be fully fetched.
+    """
+    windows = split_backfill_windows(from_year, to_year)
+    if processes > max_share():
+        # Every process needs a usable share of the NVD rate budget
+        logging.warning(f"[BACKFILL] {processes} processes would exceed the NVD rate limit, using {max_share()}")
+        processes = max_share()
+    logging.info(f"[BACKFILL] {len(windows)} window(s) from {from_year} to {to_year} "
+                 f"on {processes} process(es)")
+
+    totals = [0, 0, 0]
+    incomplete = []
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_backfill_worker,
+                             initargs=(processes,)) as pool:
+        futures = [pool.submit(_backfill_window, start, end, workers) for start, end in windows]
+        for future in as_completed(futures):
+            label, window_totals, metrics = future.result()
+            REGISTRY.merge(metrics)
+            if window_totals is None:
+                incomplete.append(label)
+                continue
+            for i, count in enumerate(window_totals):
+                totals[i] += count
+            logging.info(f"[BACKFILL] Window {label} done. Updated: {window_totals[0]}, "
+                         f"Skipped: {window_totals[1]}, Failed: {window_totals[2]}")
+
+    logging.info(f"[BACKFILL] Done. Updated: {totals[0]}, Skipped: {totals[1]}, Failed: {totals[2]}, "
+                 f"Incomplete windows: {len(incomplete)}")
+    return incomplete
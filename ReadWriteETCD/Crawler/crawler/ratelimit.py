@@ -0,0 +1,225 @@
+import ijson
+import logging
+import math
+import random
+import requests
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from .config import (
+    NVD_API_KEY, NVD_RATE_WINDOW, NVD_REQUESTS_PER_WINDOW, NVD_REQUESTS_PER_WINDOW_WITH_KEY,
+    NVD_MAX_RETRIES, NVD_BACKOFF_BASE, NVD_BACKOFF_MAX,
+)
+
+from cvestore import counter
+
+# Statuses NVD uses for throttling (403/429) or transient failures
+RETRY_STATUS = {403, 429, 500, 502, 503, 504}
+
+NVD_REQUESTS = counter("crawler_nvd_requests_total", "NVD requests made, retried attempts included")
+NVD_RETRIES = counter("crawler_nvd_retries_total", "NVD requests retried, by reason", ["reason"])
+NVD_WAIT_SECONDS = counter("crawler_nvd_wait_seconds_total",
+                           "Seconds spent waiting before NVD requests, by cause", ["cause"])
+
+
+# --- Token Bucket ---
+class TokenBucket:
+    """
+    Thread-safe token bucket. `acquire` blocks until a token is available
+    and returns how long it waited; `pause` stops all callers for a while,
+    e.g. after the server asked us to back off.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = 0
+            self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+# --- Request Scheduler ---
+def parse_retry_after(response):
+    """
+    Seconds requested by a Retry-After header (delta-seconds or HTTP date), or None.
+    """
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RequestScheduler:
+    """
+    Runs NVD requests within the published rate budget.
+
+    Throttling responses and transient errors are retried, honouring
+    Retry-After and otherwise backing off exponentially with jitter. Time
+    spent waiting (rate limit and back-off) and time spent working
+    (requests and parsing) are tracked separately.
+    """
+
+    def __init__(self, bucket, max_retries=NVD_MAX_RETRIES,
+                 backoff_base=NVD_BACKOFF_BASE, backoff_max=NVD_BACKOFF_MAX):
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.waited = 0.0
+        self.worked = 0.0
+
+    def _backoff(self, attempt):
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    def _count(self, waited=0.0, worked=0.0, requests_made=0, retries=0):
+        if requests_made:
+            NVD_REQUESTS.inc(requests_made)
+        with self.lock:
+            self.waited += waited
+            self.worked += worked
+            self.requests += requests_made
+            self.retries += retries
+
+    def run(self, request):
+        """
+        Call `request()` under the rate budget and return its result.
+        `request` should raise requests.HTTPError for bad statuses.
+        """
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            self._count(waited=waited)
+            NVD_WAIT_SECONDS.inc(waited, cause="ratelimit")
+            started = time.monotonic()
+            try:
+                result = request()
+                self._count(worked=time.monotonic() - started, requests_made=1)
+                return result
+            except requests.HTTPError as e:
+                self._count(worked=time.monotonic() - started, requests_made=1)
+                status = e.response.status_code if e.response is not None else None
+                if status not in RETRY_STATUS or attempt >= self.max_retries:
+                    raise
+                retry_after = parse_retry_after(e.response)
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                reason = f"HTTP {status}"
+                if status in (403, 429):
+                    # Throttled: hold back every thread, not just this one
+                    self.bucket.pause(delay)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    ProtocolError, ReadTimeoutError, ijson.JSONError) as e:
+                # Bodies are streamed from response.raw, so a connection lost
+                # mid-page surfaces as a urllib3 error rather than a requests one
+                self._count(worked=time.monotonic() - started, requests_made=1)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                reason = type(e).__name__
+
+            attempt += 1
+            logging.warning(f"[NVD] {reason}, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            self._count(waited=delay, retries=1)
+            NVD_RETRIES.inc(reason=reason)
+            NVD_WAIT_SECONDS.inc(delay, cause="backoff")
+            time.sleep(delay)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "waited": self.waited,
+                "worked": self.worked,
+            }
+
+    def log_stats(self):
+        stats = self.stats()
+        logging.info(f"[NVD] Requests: {stats['requests']}, Retries: {stats['retries']}, "
+                     f"Waited: {stats['waited']:.1f}s, Worked: {stats['worked']:.1f}s")
+
+
+# --- Process-wide Scheduler ---
+_scheduler = None
+
+
+def _window_limit():
+    return NVD_REQUESTS_PER_WINDOW_WITH_KEY if NVD_API_KEY else NVD_REQUESTS_PER_WINDOW
+
+
+def max_share(limit=None):
+    """
+    Most processes the NVD budget can be split between while each still
+    gets a one-request burst and some refill.
+    """
+    return max(1, math.ceil(limit or _window_limit()) - 1)
+
+
+def configure_scheduler(share=1, limit=None):
+    """
+    Create the process-wide scheduler. `share` splits the NVD budget between
+    that many processes calling NVD at the same time; it may not exceed
+    max_share(limit). `limit` overrides the requests allowed per
+    NVD_RATE_WINDOW, e.g. for a local NVD stand-in.
+    """
+    global _scheduler
+    budget = (limit or _window_limit()) / max(1, share)
+    # Keep burst + refill within the budget over any rolling window
+    capacity = max(1.0, budget / 10)
+    if budget <= capacity:
+        raise ValueError(f"an NVD budget of {budget:.2f} requests per {NVD_RATE_WINDOW}s leaves no refill; "
+                         f"split it between at most {max_share(limit)} processes")
+    rate = (budget - capacity) / NVD_RATE_WINDOW
+    _scheduler = RequestScheduler(TokenBucket(rate, capacity))
+    return _scheduler
+
+
+def get_scheduler():
+    return _scheduler or configure_scheduler()
@@ -0,0 +1,208 @@
+import logging
+import time
+from datetime import datetime
+
+from .config import (
+    ETCD_ENDPOINTS, CA_CERT_PATH, CERT_CERT_PATH, CERT_KEY_PATH,
+    ETCD_KEY_PREFIX, ETCD_DIGEST_PREFIX, ETCD_WATERMARK_KEY, ETCD_RETIRED_INDEX_PREFIX,
+    ETCD_MAX_TXN_OPS, ETCD_MAX_TXN_BYTES, ETCD_MAX_RECEIVE_BYTES,
+)
+from .nvd import format_nvd_date
+from .parse import build_cve_record
+
+from cvestore import EtcdPool, counter, histogram, parse_endpoints
+from cvestore.metrics import COUNT_BUCKETS, SIZE_BUCKETS
+
+TXN_OPS = histogram("crawler_etcd_txn_ops", "Operations per committed etcd transaction", buckets=COUNT_BUCKETS)
+TXN_BYTES = histogram("crawler_etcd_txn_bytes", "Key and value bytes per committed etcd transaction",
+                      buckets=SIZE_BUCKETS)
+TXN_SECONDS = histogram("crawler_etcd_txn_seconds", "Seconds per committed etcd transaction")
+TXN_FAILURES = counter("crawler_etcd_txn_failures_total", "etcd transactions that failed")
+STORED_CVES = counter("crawler_cves_total", "CVEs handed to the store, by result", ["result"])
+
+
+# --- etcd Connection ---
+def connect_to_etcd():
+    """
+    Establish a secure connection to every etcd member using mTLS.
+    Writes are sent to the leader and fail over to the other members.
+    """
+    return EtcdPool(
+        parse_endpoints(ETCD_ENDPOINTS),
+        ca_cert=CA_CERT_PATH,
+        cert_cert=CERT_CERT_PATH,
+        cert_key=CERT_KEY_PATH,
+        timeout=10,
+        max_receive_bytes=ETCD_MAX_RECEIVE_BYTES
+    )
+
+
+# --- Store into etcd ---
+def digest_key_for(key):
+    """
+    Companion digest key for a CVE key, e.g.
+    /vulns/cve/analyzed/CVE-1 -> /vulns/digest/analyzed/CVE-1
+    """
+    return ETCD_DIGEST_PREFIX + key[len(ETCD_KEY_PREFIX):]
+
+
+def load_existing_digests(etcd_client, status="analyzed"):
+    """
+    Read the digest of every stored CVE with a single ranged read over the
+    companion digest keys, so no CVE value has to be transferred or decoded.
+    Returns a dict mapping CVE keys to digests.
+
+    CVEs written before digests existed have no companion key; they are
+    treated as changed and get their digest on the next write.
+    """
+    prefix = f"{ETCD_DIGEST_PREFIX}{status}/"
+    existing = {}
+    for value, metadata in etcd_client.get_prefix(prefix):
+        cve_key = ETCD_KEY_PREFIX + metadata.key.decode("utf-8")[len(ETCD_DIGEST_PREFIX):]
+        existing[cve_key] = value.decode("utf-8")
+    logging.info(f"[STORE] Loaded {len(existing)} existing digests under {prefix}")
+    return existing
+
+
+def _byte_len(value):
+    return len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+
+
+def split_into_batches(changes, max_ops=ETCD_MAX_TXN_OPS, max_bytes=ETCD_MAX_TXN_BYTES):
+    """
+    Group changes into batches that fit into one etcd transaction.
+    Each change is a (key, digest, puts) tuple where `puts` lists the
+    (key, value) pairs written for it; a change is never split across batches.
+    """
+    batch = []
+    batch_ops = 0
+    batch_bytes = 0
+    for change in changes:
+        puts = change[2]
+        size = sum(_byte_len(k) + _byte_len(v) for k, v in puts)
+        if batch and (batch_ops + len(puts) > max_ops or batch_bytes + size > max_bytes):
+            yield batch, batch_bytes
+            batch = []
+            batch_ops = 0
+            batch_bytes = 0
+        batch.append(change)
+        batch_ops += len(puts)
+        batch_bytes += size
+    if batch:
+        yield batch, batch_bytes
+
+
+def commit_batch(etcd_client, batch):
+    """
+    Write one batch of changes in a single etcd transaction.
+    """
+    puts = [etcd_client.transactions.put(key, value)
+            for _, _, change_puts in batch
+            for key, value in change_puts]
+    etcd_client.transaction(compare=[], success=puts, failure=[])
+
+
+def store_cve_records_to_etcd(etcd_client, records, existing=None):
+    """
+    Store (key, value, digest) records into etcd, only if the digest differs
+    from the stored one.
+
+    `existing` maps CVE keys to their stored digests. When it is not given it
+    is loaded with one ranged read; callers storing several pages should load
+    it once and pass it in. It is updated in place with every committed write.
+    """
+    if not etcd_client or not records:
+        logging.warning("[STORE] etcd client not ready or CVE list empty.")
+        return 0, 0, 0
+
+    if existing is None:
+        existing = load_existing_digests(etcd_client)
+
+    changes = {}
+    skipped = 0
+    updated = 0
+    failed = 0
+
+    for key, etcd_value, digest in records:
+        # If value unchanged, skip
+        if existing.get(key) == digest:
+            logging.debug(f"[SKIP] No change for key: {key}")
+            skipped += 1
+            continue
+
+        changes[key] = (key, digest, [(key, etcd_value), (digest_key_for(key), digest)])
+
+    for number, (batch, batch_bytes) in enumerate(split_into_batches(changes.values()), start=1):
+        started = time.perf_counter()
+        try:
+            commit_batch(etcd_client, batch)
+        except Exception as e:
+            logging.error(f"[ETCD] Batch {number} failed ({len(batch)} CVEs): {e}")
+            TXN_FAILURES.inc()
+            failed += len(batch)
+            continue
+
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        TXN_SECONDS.observe(elapsed)
+        TXN_OPS.observe(sum(len(puts) for _, _, puts in batch))
+        TXN_BYTES.observe(batch_bytes)
+        existing.update((key, digest) for key, digest, _ in batch)
+        updated += len(batch)
+        logging.info(f"[ETCD] Batch {number}: {len(batch)} CVEs, {batch_bytes / 1024:.1f} KiB "
+                     f"in {elapsed:.3f}s ({len(batch) / elapsed:.0f} CVEs/s)")
+
+    logging.info(f"[STORE] Done. Updated: {updated}, Skipped: {skipped}, Failed: {failed}")
+    STORED_CVES.inc(updated, result="updated")
+    STORED_CVES.inc(skipped, result="skipped")
+    STORED_CVES.inc(failed, result="failed")
+    return updated, skipped, failed
+
+
+def store_cve_entries_to_etcd(etcd_client, cve_list, existing=None):
+    """
+    Store raw NVD entries into etcd, only if content differs from existing value.
+    """
+    records = []
+    for cve_raw in cve_list or []:
+        try:
+            record = build_cve_record(cve_raw)
+        except Exception as e:
+            logging.error(f"[STORE] Error preparing CVE: {e}")
+            continue
+        if record is not None:
+            records.append(record)
+    return store_cve_records_to_etcd(etcd_client, records, existing)
+
+
+def drop_retired_index(etcd_client):
+    """
+    Delete the secondary index keys earlier crawler versions wrote under
+    ETCD_RETIRED_INDEX_PREFIX. A no-op once they are gone; a failure is
+    only logged, the next run tries again.
+    """
+    try:
+        response = etcd_client.delete_prefix(ETCD_RETIRED_INDEX_PREFIX)
+    except Exception as e:
+        logging.warning(f"[STORE] Could not delete retired index keys: {e}")
+        return
+    if response.deleted:
+        logging.info(f"[STORE] Deleted {response.deleted} retired index keys under {ETCD_RETIRED_INDEX_PREFIX}")
+
+
+# --- Incremental Watermark ---
+def read_watermark(etcd_client):
+    """
+    Return the stored lastModified watermark, or None if there is none yet.
+    """
+    value, _ = etcd_client.get(ETCD_WATERMARK_KEY)
+    if value is None:
+        return None
+    return datetime.fromisoformat(value.decode("utf-8").replace("Z", "+00:00"))
+
+
+def write_watermark(etcd_client, value: datetime):
+    """
+    Persist the lastModified watermark.
+    """
+    etcd_client.put(ETCD_WATERMARK_KEY, format_nvd_date(value))
+    logging.info(f"[SYNC] Watermark advanced to {format_nvd_date(value)}")
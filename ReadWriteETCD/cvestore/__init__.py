@@ -0,0 +1,5 @@
+# Storage helpers shared by the Crawler (writer) and the Analyzer (reader)
+from .client import EtcdPool, parse_endpoints
+from .codec import decode_value, encode_value, CODEC_VERSION
+from .keys import CVE_PREFIX, ANALYZED_PREFIX
+from .metrics import REGISTRY, counter, gauge, histogram
@@ -0,0 +1,37 @@
+import argparse
+import base64
+import json
+import sys
+import zlib
+
+from .codec import decode_value
+
+
+def decode(stream):
+    """
+    Print the CVE values in `etcdctl get -w json` output as JSON, one key
+    per line followed by its value.
+    """
+    response = json.load(stream)
+    for kv in response.get("kvs", []):
+        print(base64.b64decode(kv["key"]).decode("utf-8"))
+        try:
+            data = decode_value(base64.b64decode(kv.get("value", "")))
+        except (ValueError, IndexError, zlib.error) as e:
+            print(f"[SKIP] Undecodable value: {e}")
+            continue
+        print(json.dumps(data, ensure_ascii=False, sort_keys=True))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cvestore", description="Inspect CVE data stored in etcd.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("decode", help="decode `etcdctl get -w json` output read from stdin, e.g. "
+                                       "etcdctl get /vulns/cve/ --prefix -w json | python -m cvestore decode")
+    parser.parse_args(argv)
+    decode(sys.stdin)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
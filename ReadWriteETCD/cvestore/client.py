@@ -0,0 +1,240 @@
+import etcd3
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+from etcd3.client import KVMetadata, Transactions
+from etcd3.exceptions import ConnectionFailedError, ConnectionTimeoutError
+
+from .metrics import SIZE_BUCKETS, counter, histogram
+
+# Errors that mean "this member is unreachable", as opposed to a bad request
+FAILOVER_ERRORS = (ConnectionFailedError, ConnectionTimeoutError)
+
+# How often member health and the leader are re-checked, in seconds
+HEALTH_CHECK_INTERVAL = 10
+# How long a failed member is skipped before it is tried again, in seconds
+MEMBER_RETRY_AFTER = 30
+# Weight of the newest sample in the per-member latency average
+LATENCY_SMOOTHING = 0.2
+
+ETCD_REQUEST_SECONDS = histogram("etcd_request_seconds", "etcd calls that succeeded, by method", ["method"])
+ETCD_FAILOVERS = counter("etcd_failovers_total", "etcd calls retried on another member", ["method", "member"])
+ETCD_READ_KEYS = counter("etcd_read_keys_total", "Keys returned by range reads", ["method"])
+ETCD_READ_BYTES = histogram("etcd_read_bytes", "Key and value bytes returned by one range read",
+                            ["method"], buckets=SIZE_BUCKETS)
+
+
+def parse_endpoints(value):
+    """
+    Parse "host:port,host:port" into a list of (host, port) tuples.
+    """
+    endpoints = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        item = item.split("://", 1)[-1]
+        host, _, port = item.rpartition(":")
+        endpoints.append((host, int(port)) if host else (port, 2379))
+    return endpoints
+
+
+def url_endpoint(url):
+    """
+    (host, port) of an etcd client URL such as "https://10.0.0.1:2379".
+    """
+    parts = urlsplit(url if "://" in url else f"//{url}")
+    return (parts.hostname or "").lower(), parts.port or 2379
+
+
+# --- Cluster Member ---
+class EtcdMember:
+    def __init__(self, host, port, client):
+        self.host = host
+        self.port = port
+        self.client = client
+        self.latency = None
+        self.down_until = 0.0
+
+    @property
+    def name(self):
+        return f"{self.host}:{self.port}"
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.down_until
+
+    def record_latency(self, seconds):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+
+    def mark_down(self):
+        self.down_until = time.monotonic() + MEMBER_RETRY_AFTER
+
+
+# --- Client Pool ---
+class EtcdPool:
+    """
+    Client for a multi-member etcd cluster, with the same call interface as
+    an etcd3 client for the calls this project uses.
+
+    Reads go to healthy members, either round-robin or to the member with
+    the lowest observed latency. Writes go to the leader first. When a member
+    is unreachable it is skipped for MEMBER_RETRY_AFTER seconds and the call
+    is retried on the next member.
+
+    `max_receive_bytes` raises gRPC's 4 MiB cap on a single response, which
+    whole-prefix reads outgrow long before the corpus is complete.
+    """
+
+    def __init__(self, endpoints, ca_cert=None, cert_cert=None, cert_key=None,
+                 timeout=10, read_policy="least-latency", max_receive_bytes=None):
+        if read_policy not in ("least-latency", "round-robin"):
+            raise ValueError(f"unknown read policy: {read_policy}")
+        grpc_options = None
+        if max_receive_bytes:
+            grpc_options = [("grpc.max_receive_message_length", max_receive_bytes)]
+        self.members = [
+            EtcdMember(host, port, etcd3.client(host=host, port=port, ca_cert=ca_cert,
+                                                cert_cert=cert_cert, cert_key=cert_key, timeout=timeout,
+                                                grpc_options=grpc_options))
+            for host, port in endpoints
+        ]
+        if not self.members:
+            raise ValueError("no etcd endpoints configured")
+        self.read_policy = read_policy
+        self.transactions = Transactions()
+        self.leader = None
+        self.lock = threading.Lock()
+        self._next_read = 0
+        self._checked_at = 0.0
+
+    # --- Health ---
+    def check_health(self):
+        """
+        Ping every member, refresh latencies and find the current leader.
+        Members marked down are left alone until MEMBER_RETRY_AFTER has passed,
+        so an unreachable member costs one timeout per retry period.
+        """
+        leader = None
+        for member in self.members:
+            if not member.healthy:
+                continue
+            started = time.monotonic()
+            try:
+                status = member.client.status()
+            except FAILOVER_ERRORS as e:
+                logging.warning(f"[ETCD] Member {member.name} unreachable: {e}")
+                with self.lock:
+                    member.mark_down()
+                continue
+            with self.lock:
+                member.down_until = 0.0
+            member.record_latency(time.monotonic() - started)
+            if leader is None and status.leader is not None:
+                leader_endpoints = {url_endpoint(url) for url in status.leader.client_urls}
+                leader = next((m for m in self.members
+                               if (m.host.strip("[]").lower(), m.port) in leader_endpoints), None)
+        with self.lock:
+            self.leader = leader
+            self._checked_at = time.monotonic()
+
+    def _maybe_check_health(self):
+        # Claim the check before probing, so concurrent callers go on with
+        # the current state instead of sweeping the cluster too
+        with self.lock:
+            now = time.monotonic()
+            if now - self._checked_at < HEALTH_CHECK_INTERVAL:
+                return
+            self._checked_at = now
+        self.check_health()
+
+    def _read_order(self):
+        self._maybe_check_health()
+        healthy = [m for m in self.members if m.healthy]
+        down = [m for m in self.members if not m.healthy]
+        if self.read_policy == "round-robin":
+            with self.lock:
+                start = self._next_read % max(1, len(healthy))
+                self._next_read += 1
+            healthy = healthy[start:] + healthy[:start]
+        else:
+            healthy.sort(key=lambda m: float("inf") if m.latency is None else m.latency)
+        # Members marked down are still tried as a last resort
+        return healthy + down
+
+    def _write_order(self):
+        self._maybe_check_health()
+        order = [m for m in self.members if m.healthy]
+        leader = self.leader
+        if leader in order:
+            order.remove(leader)
+            order.insert(0, leader)
+        return order + [m for m in self.members if not m.healthy]
+
+    def _call(self, order, method, *args, **kwargs):
+        error = None
+        for member in order:
+            started = time.monotonic()
+            try:
+                result = getattr(member.client, method)(*args, **kwargs)
+            except FAILOVER_ERRORS as e:
+                logging.warning(f"[ETCD] {method} failed on {member.name}, failing over: {e}")
+                ETCD_FAILOVERS.inc(method=method, member=member.name)
+                with self.lock:
+                    member.mark_down()
+                    if member is self.leader:
+                        self._checked_at = 0.0
+                error = e
+                continue
+            elapsed = time.monotonic() - started
+            member.record_latency(elapsed)
+            ETCD_REQUEST_SECONDS.observe(elapsed, method=method)
+            return result
+        raise error
+
+    def reader(self):
+        """
+        The etcd3 client reads would currently be sent to.
+        """
+        return self._read_order()[0].client
+
+    # --- Reads ---
+    @staticmethod
+    def _count_read(method, kvs):
+        ETCD_READ_KEYS.inc(len(kvs), method=method)
+        ETCD_READ_BYTES.observe(sum(len(kv.key) + len(kv.value) for kv in kvs), method=method)
+
+    def get(self, key, **kwargs):
+        return self._call(self._read_order(), "get", key, **kwargs)
+
+    def get_prefix(self, key_prefix, **kwargs):
+        response = self.get_prefix_response(key_prefix, **kwargs)
+        return [(kv.value, KVMetadata(kv, response.header)) for kv in response.kvs]
+
+    def get_prefix_response(self, key_prefix, **kwargs):
+        response = self._call(self._read_order(), "get_prefix_response", key_prefix, **kwargs)
+        self._count_read("get_prefix_response", response.kvs)
+        return response
+
+    def status(self):
+        return self._call(self._read_order(), "status")
+
+    # --- Writes ---
+    def put(self, key, value, **kwargs):
+        return self._call(self._write_order(), "put", key, value, **kwargs)
+
+    def delete(self, key, **kwargs):
+        return self._call(self._write_order(), "delete", key, **kwargs)
+
+    def delete_prefix(self, prefix):
+        return self._call(self._write_order(), "delete_prefix", prefix)
+
+    def transaction(self, compare, success=None, failure=None):
+        ops = list(compare) + list(success or []) + list(failure or [])
+        read_only = all(isinstance(op, self.transactions.get) for op in ops)
+        order = self._read_order() if read_only else self._write_order()
+        return self._call(order, "transaction", compare, success, failure)
@@ -0,0 +1,278 @@
+import json
+import struct
+import zlib
+
+# --- Value Format ---
+# A stored CVE value is either legacy JSON text (first byte "{") or a
+# versioned binary record:
+#
+#   byte 0    format version (FORMAT_V1)
+#   byte 1    flags (FLAG_ZLIB: body is zlib-compressed with ZLIB_DICT)
+#   byte 2..  body
+#
+# Body layout for FORMAT_V1, where str? is a varint of (length + 1) followed
+# by UTF-8 bytes, 0 meaning None:
+#
+#   str?    cveId
+#   str?    datePublished
+#   str?    dateModified
+#   u8      baseScore * 10 (SCORE_NONE when missing)
+#   u8      severity code (SEVERITY_NONE when missing, SEVERITY_LITERAL + str?)
+#   varint  number of references, then per reference:
+#             varint tag: 0 -> str? full URL
+#                         n -> host REFERENCE_HOSTS[n // 2 - 1],
+#                              https if n is odd, then str? rest of the URL
+#
+# REFERENCE_HOSTS and ZLIB_DICT are part of the format: only append to them
+# together with a new format version, never reorder.
+FORMAT_V1 = 0x01
+CODEC_VERSION = FORMAT_V1
+
+FLAG_ZLIB = 0x01
+
+SCORE_NONE = 0xFF
+SEVERITY_NONE = 0xFF
+SEVERITY_LITERAL = 0xFE
+SEVERITIES = ["NONE", "LOW", "MEDIUM", "HIGH", "CRITICAL"]
+SEVERITY_CODES = {name: code for code, name in enumerate(SEVERITIES)}
+
+# Hosts that account for most NVD reference URLs
+REFERENCE_HOSTS = [
+    "github.com",
+    "nvd.nist.gov",
+    "security.netapp.com",
+    "lists.fedoraproject.org",
+    "www.openwall.com",
+    "lists.debian.org",
+    "www.debian.org",
+    "security.gentoo.org",
+    "access.redhat.com",
+    "bugzilla.redhat.com",
+    "www.oracle.com",
+    "support.apple.com",
+    "msrc.microsoft.com",
+    "portal.msrc.microsoft.com",
+    "www.wordfence.com",
+    "plugins.trac.wordpress.org",
+    "wpscan.com",
+    "patchstack.com",
+    "vuldb.com",
+    "huntr.com",
+    "huntr.dev",
+    "packetstormsecurity.com",
+    "www.exploit-db.com",
+    "seclists.org",
+    "www.securityfocus.com",
+    "www.zerodayinitiative.com",
+    "ubuntu.com",
+    "usn.ubuntu.com",
+    "gitlab.com",
+    "hackerone.com",
+    "cert-portal.siemens.com",
+    "www.ibm.com",
+    "exchange.xforce.ibmcloud.com",
+    "source.android.com",
+    "chromereleases.googleblog.com",
+    "crbug.com",
+    "bugzilla.mozilla.org",
+    "www.mozilla.org",
+    "lists.apache.org",
+    "www.kb.cert.org",
+    "www.cisa.gov",
+    "security.snyk.io",
+    "git.kernel.org",
+    "www.tenable.com",
+    "jvn.jp",
+    "gist.github.com",
+    "raw.githubusercontent.com",
+    "support.f5.com",
+    "my.f5.com",
+    "www.vulncheck.com",
+]
+HOST_INDEX = {host: index for index, host in enumerate(REFERENCE_HOSTS)}
+
+# Preset zlib dictionary: URL path fragments that host tokenization leaves behind
+ZLIB_DICT = b"".join(fragment.encode("ascii") for fragment in [
+    "/archives/list/package-announce@lists.fedoraproject.org/message/",
+    "/security/advisories/GHSA-",
+    "/show_bug.cgi?id=",
+    "/releases/tag/v",
+    "/commit/",
+    "/issues/",
+    "/pull/",
+    "/blob/main/",
+    "/blob/master/",
+    "/advisory/ntap-",
+    "/glsa/20",
+    "/security/",
+    "/oss-sec/20",
+    "/lists/oss-security/20",
+    "/vulnerabilities/wordpress-plugins/",
+    "/threat-intel/vulnerabilities/id/",
+    "/browser/",
+    "/trunk/",
+    "/tags/",
+    "/?p=",
+    "?id=",
+    "?ctiid.",
+    "CVE-20",
+])
+
+
+# --- Primitives ---
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_str(out, value):
+    if value is None:
+        out.append(0)
+        return
+    data = value.encode("utf-8")
+    _write_varint(out, len(data) + 1)
+    out += data
+
+
+def _read_str(buf, pos):
+    length, pos = _read_varint(buf, pos)
+    if length == 0:
+        return None, pos
+    end = pos + length - 1
+    return bytes(buf[pos:end]).decode("utf-8"), end
+
+
+def _split_reference(url):
+    """
+    Return (tag, rest) for a reference URL, see the format notes above.
+    """
+    for scheme, secure in (("https://", 1), ("http://", 0)):
+        if url.startswith(scheme):
+            rest = url[len(scheme):]
+            cut = len(rest)
+            for sep in "/?#":
+                found = rest.find(sep)
+                if found != -1 and found < cut:
+                    cut = found
+            index = HOST_INDEX.get(rest[:cut])
+            if index is not None:
+                return (index + 1) * 2 + secure, rest[cut:]
+            break
+    return 0, url
+
+
+def _join_reference(tag, rest):
+    if tag == 0:
+        return rest
+    scheme = "https://" if tag & 1 else "http://"
+    return scheme + REFERENCE_HOSTS[tag // 2 - 1] + (rest or "")
+
+
+# --- Encode / Decode ---
+def encode_value(data, compress=True):
+    """
+    Encode a CVE summary dict into the current binary value format.
+    The body is zlib-compressed only when that makes it smaller.
+    """
+    body = bytearray()
+    _write_str(body, data.get("cveId"))
+    _write_str(body, data.get("datePublished"))
+    _write_str(body, data.get("dateModified"))
+
+    score = data.get("baseScore")
+    body.append(SCORE_NONE if score is None else int(round(float(score) * 10)))
+
+    severity = data.get("baseSeverity")
+    if severity is None:
+        body.append(SEVERITY_NONE)
+    elif severity in SEVERITY_CODES:
+        body.append(SEVERITY_CODES[severity])
+    else:
+        body.append(SEVERITY_LITERAL)
+        _write_str(body, severity)
+
+    references = data.get("references") or []
+    _write_varint(body, len(references))
+    for url in references:
+        tag, rest = _split_reference(url)
+        _write_varint(body, tag)
+        _write_str(body, rest)
+
+    flags = 0
+    if compress:
+        compressor = zlib.compressobj(9, zdict=ZLIB_DICT)
+        packed = compressor.compress(bytes(body)) + compressor.flush()
+        if len(packed) < len(body):
+            body = packed
+            flags |= FLAG_ZLIB
+
+    return struct.pack("BB", FORMAT_V1, flags) + bytes(body)
+
+
+def decode_value(value):
+    """
+    Decode a stored CVE value into a summary dict.
+    Accepts both the binary format and legacy JSON values.
+    """
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if not value:
+        raise ValueError("empty CVE value")
+
+    version = value[0]
+    if version == ord("{"):
+        return json.loads(value.decode("utf-8"))
+    if version != FORMAT_V1:
+        raise ValueError(f"unsupported CVE value format: {version:#04x}")
+
+    flags = value[1]
+    body = value[2:]
+    if flags & FLAG_ZLIB:
+        decompressor = zlib.decompressobj(zdict=ZLIB_DICT)
+        body = decompressor.decompress(body) + decompressor.flush()
+
+    pos = 0
+    cve_id, pos = _read_str(body, pos)
+    published, pos = _read_str(body, pos)
+    modified, pos = _read_str(body, pos)
+
+    score = body[pos]
+    pos += 1
+    severity_code = body[pos]
+    pos += 1
+    if severity_code == SEVERITY_NONE:
+        severity = None
+    elif severity_code == SEVERITY_LITERAL:
+        severity, pos = _read_str(body, pos)
+    else:
+        severity = SEVERITIES[severity_code]
+
+    count, pos = _read_varint(body, pos)
+    references = []
+    for _ in range(count):
+        tag, pos = _read_varint(body, pos)
+        rest, pos = _read_str(body, pos)
+        references.append(_join_reference(tag, rest))
+
+    return {
+        "cveId": cve_id,
+        "datePublished": published,
+        "dateModified": modified,
+        "baseScore": None if score == SCORE_NONE else score / 10,
+        "baseSeverity": severity,
+        "references": references
+    }
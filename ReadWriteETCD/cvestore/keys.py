@@ -0,0 +1,9 @@
+# --- Key Layout ---
+# /vulns/cve/<status>/<cveId>                 CVE value (see codec)
+# /vulns/digest/<status>/<cveId>              crawler change-detection record
+#
+# /vulns/idx/ held a published/modified/severity index that nothing reads
+# since the analyzer serves from its watch-fed dataset; the crawler no
+# longer writes it and deletes what earlier versions left behind.
+CVE_PREFIX = '/vulns/cve/'
+ANALYZED_PREFIX = CVE_PREFIX + 'analyzed/'